@@ -1,29 +1,48 @@
 import os
+import sys
+from typing import Callable, Optional
 from tools.dspy_wiki_rag import dspy_wiki_rag, dspy_wiki_search
+from tools.retrieval_context import RetrievalMemo, retrieval_scope
+from streaming import print_events, stream_agent
 from langchain_openai import ChatOpenAI
 from langchain.tools import Tool
 from langchain.agents import initialize_agent, AgentType
 from langchain.memory import ConversationBufferWindowMemory
 
-def init_lm(model_name: str = "gpt-4o-mini", temperature: float = 0.2):
-    """Initialize the language model"""
-    llm = ChatOpenAI(model=model_name, api_key=os.getenv("OPENAI_API_KEY"), temperature=temperature)
+try:
+    from backend.openai_governor import GovernedChatOpenAI
+except ImportError:
+    # Fallback when run as a standalone script: add the repo root to path
+    sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+    from backend.openai_governor import GovernedChatOpenAI
+
+def init_lm(model_name: str = "gpt-4o-mini", temperature: float = 0.2, streaming: bool = False):
+    """Initialize the language model. streaming=True is needed for token events from stream_agent."""
+    llm = GovernedChatOpenAI(model=model_name, api_key=os.getenv("OPENAI_API_KEY"), temperature=temperature, streaming=streaming)
     return llm
 
-def init_tools():
-    """Initialize the tools"""
-    tools = [Tool(name="dspy_wiki_search", func=dspy_wiki_search, description="Search Wikipedia for information"), Tool(name="dspy_wiki_rag", func=dspy_wiki_rag, description="Answer a question using the WikiRAG pipeline")]
+def _scoped(func: Callable[[str], str], memo: RetrievalMemo) -> Callable[[str], str]:
+    """Run a tool inside the conversation's retrieval scope."""
+    def run(query: str) -> str:
+        with retrieval_scope(memo):
+            return func(query)
+    return run
+
+def init_tools(memo: Optional[RetrievalMemo] = None):
+    """Initialize the tools. Both tools share `memo`, so pages fetched by one are reused by the other."""
+    memo = memo or RetrievalMemo()
+    tools = [Tool(name="dspy_wiki_search", func=_scoped(dspy_wiki_search, memo), description="Search Wikipedia for information"), Tool(name="dspy_wiki_rag", func=_scoped(dspy_wiki_rag, memo), description="Answer a question using the WikiRAG pipeline")]
     return tools
 
-def init_agent(llm: ChatOpenAI):
-    """Initialize the agent"""
+def init_agent(llm: ChatOpenAI, memo: Optional[RetrievalMemo] = None, verbose: bool = True):
+    """Initialize the agent. One agent is one conversation, with its own retrieval memo."""
     memory = ConversationBufferWindowMemory(k=1, return_messages=True)
-    tools = init_tools()
+    tools = init_tools(memo)
     agent = initialize_agent(
         tools=tools,
         agent=AgentType.ZERO_SHOT_REACT_DESCRIPTION,  # avoids stop param for some models
         llm=llm,
-        verbose=True,
+        verbose=verbose,
         memory=memory,
         max_iterations=4,
         early_stopping_method="generate",
@@ -31,7 +50,7 @@ def init_agent(llm: ChatOpenAI):
     return agent
 
 if __name__ == "__main__":
-    llm = init_lm()
-    agent = init_agent(llm)
+    llm = init_lm(streaming=True)
+    agent = init_agent(llm, verbose=False)
     input_text = input("Enter a question: ")
-    agent.run(input_text)
\ No newline at end of file
+    print_events(stream_agent(agent, input_text))
\ No newline at end of file
@@ -0,0 +1,396 @@
+"""Offline latency/throughput benchmark for WikiRAG, compile_rag and the Wiki agent.
+
+Replaces the `wikipedia` module with a local corpus and the OpenAI LMs with
+deterministic stubs (fixed latency and token counts), so runs are repeatable
+and need no network. Run from this directory:
+
+    python benchmark.py --concurrency 1 4 16 --lm-latency 0.2 --out bench_report.json
+"""
+from __future__ import annotations
+
+import argparse
+import contextlib
+import io
+import json
+import platform
+import re
+import sys
+import threading
+import time
+import types
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+import dspy as dspy  # type: ignore
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+# ----------------------
+# Local corpus stand-in for `wikipedia`
+# ----------------------
+
+LOCAL_CORPUS: Dict[str, str] = {
+    "Paris": "Paris is the capital and largest city of France, on the Seine river.",
+    "Berlin": "Berlin is the capital and largest city of Germany.",
+    "President of the United States": "The president of the United States is the head of state and head of government of the United States.",
+    "Manchester United F.C.": "Manchester United Football Club is an English football club based in Old Trafford, Greater Manchester. Its manager is Ruben Amorim.",
+    "January 6 United States Capitol attack": "On January 6, 2021, a mob of supporters of Donald Trump attacked the United States Capitol in Washington, D.C.",
+    "Perplexity AI": "Perplexity AI is an American company offering an AI search engine. Its CEO is Aravind Srinivas.",
+    "Acquisition of Twitter by Elon Musk": "Elon Musk completed the acquisition of Twitter in October 2022.",
+    "Transformer (deep learning architecture)": "A transformer is a deep learning architecture based on the multi-head self-attention mechanism.",
+    "Alexander Fleming": "Alexander Fleming was a Scottish physician who discovered penicillin in 1928.",
+    "Mount Everest": "Mount Everest is Earth's highest mountain above sea level, in the Himalayas.",
+    "Python (programming language)": "Python is a high-level, general-purpose programming language created by Guido van Rossum.",
+    "Great Barrier Reef": "The Great Barrier Reef is the world's largest coral reef system, off the coast of Queensland, Australia.",
+    "Photosynthesis": "Photosynthesis is the process by which plants convert light energy into chemical energy.",
+    "Apollo 11": "Apollo 11 was the spaceflight that first landed humans on the Moon, in July 1969.",
+}
+
+# Fixed question set. Paraphrases are included on purpose so cache hit rates are meaningful.
+QUESTIONS: List[str] = [
+    "What is the capital of France?",
+    "What's the capital of France",
+    "What is the capital of Germany?",
+    "Who is the current Manchester United manager?",
+    "Who is the Manchester United manager currently?",
+    "What happened on January 6th 2021?",
+    "Who is the CEO of Perplexity?",
+    "When did Elon Musk buy Twitter?",
+    "How do transformers use self-attention?",
+    "Who discovered penicillin?",
+    "Who discovered penicillin",
+    "How tall is Mount Everest?",
+    "Who created the Python programming language?",
+    "Where is the Great Barrier Reef?",
+    "What is photosynthesis?",
+    "When did Apollo 11 land on the Moon?",
+]
+
+
+def _words(text: str) -> set:
+    return set(re.findall(r"[a-z0-9]+", text.lower()))
+
+
+class _LocalPage:
+    def __init__(self, title: str, summary: str):
+        self.title = title
+        self.summary = summary
+
+
+def make_local_wikipedia(corpus: Dict[str, str], latency: float = 0.0) -> types.ModuleType:
+    """Build a module exposing the `wikipedia.search` / `wikipedia.page` calls we use."""
+    module = types.ModuleType("wikipedia")
+    module.calls = {"search": 0, "page": 0}
+
+    def search(query: str, results: int = 10) -> List[str]:
+        module.calls["search"] += 1
+        time.sleep(latency)
+        q = _words(query)
+        scored = [(len(q & _words(title + " " + summary)), title) for title, summary in corpus.items()]
+        return [title for score, title in sorted(scored, key=lambda s: (-s[0], s[1])) if score > 0][:results]
+
+    def page(title: str, auto_suggest: bool = True) -> _LocalPage:
+        module.calls["page"] += 1
+        time.sleep(latency)
+        if title not in corpus:
+            raise KeyError(title)
+        return _LocalPage(title, corpus[title])
+
+    module.search = search
+    module.page = page
+    return module
+
+
+# ----------------------
+# Stub LMs
+# ----------------------
+
+class TokenMeter:
+    """Thread-safe prompt/completion token and call counter."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+
+    def add(self, prompt_tokens: int, completion_tokens: int) -> None:
+        with self._lock:
+            self.calls += 1
+            self.prompt_tokens += prompt_tokens
+            self.completion_tokens += completion_tokens
+
+    def snapshot(self) -> Dict[str, int]:
+        with self._lock:
+            return {"calls": self.calls, "prompt_tokens": self.prompt_tokens, "completion_tokens": self.completion_tokens}
+
+
+def _approx_tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+class StubLM(dspy.LM):
+    """Deterministic DSPy LM: sleeps `latency` seconds and answers from the first passage.
+
+    Output follows ChatAdapter's `[[ ## field ## ]]` format for whatever output
+    fields the signature asks for.
+    """
+
+    def __init__(self, latency: float = 0.2, completion_tokens: int = 120):
+        super().__init__(model="openai/offline-stub", cache=False)
+        self.latency = latency
+        self.stub_completion_tokens = completion_tokens
+        self.meter = TokenMeter()
+
+    def __call__(self, prompt: Optional[str] = None, messages: Optional[List[Dict[str, Any]]] = None, **kwargs) -> List[str]:
+        messages = messages or [{"role": "user", "content": prompt or ""}]
+        text = "\n".join(str(m.get("content", "")) for m in messages)
+        time.sleep(self.latency)
+        self.meter.add(_approx_tokens(text), self.stub_completion_tokens)
+        return [self._completion(messages)]
+
+    def _completion(self, messages: List[Dict[str, Any]]) -> str:
+        system = str(messages[0].get("content", "")) if messages else ""
+        block = system.split("Your output fields are:", 1)[-1].split("All interactions", 1)[0]
+        fields = re.findall(r"`(\w+)`", block) or ["reasoning", "answer"]
+
+        last_user = str(messages[-1].get("content", ""))
+        passage = re.search(r"\[1\] ([^:\n]+): ([^.\n]+)", last_user)
+        answer = f"{passage.group(2)}. [1]" if passage else "I could not find this in the passages."
+        values = {"reasoning": "The first passage answers the question.", "answer": answer, "passages": "[]"}
+        parts = [f"[[ ## {f} ## ]]\n{values.get(f, answer)}" for f in fields]
+        return "\n\n".join(parts + ["[[ ## completed ## ]]"])
+
+
+class StubChatModel(BaseChatModel):
+    """Deterministic ReAct chat model for the LangChain agent.
+
+    First turn calls `dspy_wiki_rag` with the question; once an Observation is
+    in the scratchpad it returns that observation as the Final Answer.
+    """
+
+    latency: float = 0.2
+    completion_tokens: int = 60
+    meter: Any = None
+    streaming: bool = False  # stream the reply word by word, spreading `latency` across chunks
+
+    @property
+    def _llm_type(self) -> str:
+        return "offline-stub-chat"
+
+    def _reply(self, messages: List[BaseMessage]) -> str:
+        text = "\n".join(str(m.content) for m in messages)
+        # Everything after the last "Question:" is the question plus this run's scratchpad.
+        head, _, tail = text.rpartition("Question: ")
+        question, _, scratchpad = (tail if head else text).partition("\n")
+        observations = re.findall(r"Observation: (.*)", scratchpad)
+        if observations:
+            return f"Thought: I now know the final answer\nFinal Answer: {observations[-1].strip()}"
+        return f"Thought: I should answer this with the wiki pipeline.\nAction: dspy_wiki_rag\nAction Input: {question.strip()}"
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager=None, **kwargs) -> ChatResult:
+        time.sleep(self.latency)
+        reply = self._reply(messages)
+        if self.meter is not None:
+            self.meter.add(_approx_tokens("\n".join(str(m.content) for m in messages)), self.completion_tokens)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=reply))])
+
+    def _should_stream(self, *, async_api: bool, run_manager=None, **kwargs: Any) -> bool:
+        return self.streaming
+
+    def _stream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager=None, **kwargs) -> Iterator[ChatGenerationChunk]:
+        words = self._reply(messages).split(" ")
+        if self.meter is not None:
+            self.meter.add(_approx_tokens("\n".join(str(m.content) for m in messages)), self.completion_tokens)
+        for i, word in enumerate(words):
+            time.sleep(self.latency / len(words))
+            text = word if i == 0 else " " + word
+            if run_manager:
+                run_manager.on_llm_new_token(text)
+            yield ChatGenerationChunk(message=AIMessageChunk(content=text))
+
+
+# ----------------------
+# Measurement
+# ----------------------
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile; 0.0 for an empty list."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, int(round(pct / 100 * len(ordered) + 0.5 - 1e-9)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+def summarize(latencies: List[float], wall: float) -> Dict[str, float]:
+    return {
+        "n": len(latencies),
+        "p50_ms": round(1000 * percentile(latencies, 50), 3),
+        "p95_ms": round(1000 * percentile(latencies, 95), 3),
+        "max_ms": round(1000 * max(latencies, default=0.0), 3),
+        "wall_s": round(wall, 4),
+        "throughput_qps": round(len(latencies) / wall, 3) if wall > 0 else 0.0,
+    }
+
+
+def timed_run(fn: Callable[[str], Any], questions: List[str], concurrency: int = 1) -> Dict[str, float]:
+    latencies: List[float] = []
+    lock = threading.Lock()
+
+    def one(q: str) -> None:
+        start = time.perf_counter()
+        fn(q)
+        with lock:
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        if concurrency <= 1:
+            for q in questions:
+                one(q)
+        else:
+            with ThreadPoolExecutor(max_workers=concurrency) as pool:
+                list(pool.map(one, questions))
+    return summarize(latencies, time.perf_counter() - start)
+
+
+def _delta(after: Dict[str, int], before: Dict[str, int]) -> Dict[str, int]:
+    return {k: after[k] - before.get(k, 0) for k in after}
+
+
+def _cache_delta(after: Dict[str, Any], before: Dict[str, Any]) -> Dict[str, Any]:
+    """Answer-cache counters for one section of the run."""
+    keys = ("hits", "near_hits", "misses", "stores", "evictions", "expirations")
+    row = {k: after[k] - before[k] for k in keys}
+    lookups = row["hits"] + row["near_hits"] + row["misses"]
+    row["hit_rate"] = round((row["hits"] + row["near_hits"]) / lookups, 4) if lookups else 0.0
+    return row
+
+
+def run_benchmark(args: argparse.Namespace) -> Dict[str, Any]:
+    wiki = make_local_wikipedia(LOCAL_CORPUS, latency=args.wiki_latency)
+    sys.modules["wikipedia"] = wiki
+    lm = StubLM(latency=args.lm_latency, completion_tokens=args.completion_tokens)
+    dspy.configure(lm=lm)
+
+    report: Dict[str, Any] = {
+        "config": {k: v for k, v in sorted(vars(args).items()) if k != "out"},
+        "environment": {"python": platform.python_version(), "platform": platform.platform()},
+        "questions": len(QUESTIONS),
+    }
+
+    # Importing the tool module compiles RAG against the stubs.
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        from tools import dspy_wiki_rag as wiki_rag
+    report["import_and_compile_s"] = round(time.perf_counter() - start, 4)
+
+    before = lm.meter.snapshot()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        wiki_rag.compile_rag(wiki_rag.WikiRAG(top_k=5))
+    report["compile_rag"] = {"seconds": round(time.perf_counter() - start, 4), "tokens": _delta(lm.meter.snapshot(), before)}
+
+    cache = wiki_rag.ANSWER_CACHE
+    questions = QUESTIONS * args.repeat
+
+    # Single-question latency: cold answers with the cache cleared, then warm.
+    cache.clear()
+    before, cache_before = lm.meter.snapshot(), cache.stats()
+    cold = timed_run(wiki_rag.dspy_wiki_rag, questions)
+    cold["tokens"] = _delta(lm.meter.snapshot(), before)
+    cold["cache"] = _cache_delta(cache.stats(), cache_before)
+    before, cache_before = lm.meter.snapshot(), cache.stats()
+    warm = timed_run(wiki_rag.dspy_wiki_rag, questions)
+    warm["tokens"] = _delta(lm.meter.snapshot(), before)
+    warm["cache"] = _cache_delta(cache.stats(), cache_before)
+    report["rag_latency"] = {"cold": cold, "warm": warm}
+
+    # Throughput with the cache cleared before each level, so only the LM is measured.
+    throughput = []
+    for c in args.concurrency:
+        cache.clear()
+        row = timed_run(wiki_rag.dspy_wiki_rag, questions, concurrency=c)
+        row.update(mode="threads", concurrency=c)
+        throughput.append(row)
+
+        cache.clear()
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            n = sum(1 for _ in wiki_rag.dspy_wiki_rag_batch(questions, max_concurrency=c))
+        wall = time.perf_counter() - start
+        throughput.append({
+            "mode": "batch",
+            "concurrency": c,
+            "n": n,
+            "wall_s": round(wall, 4),
+            "throughput_qps": round(n / wall, 3) if wall > 0 else 0.0,
+        })
+    report["rag_throughput"] = throughput
+
+    # End-to-end agent: a fresh agent (and retrieval memo) per question.
+    from agent import init_agent
+
+    cache.clear()
+    chat_meter = TokenMeter()
+    chat = StubChatModel(latency=args.lm_latency, completion_tokens=args.completion_tokens, meter=chat_meter)
+    before, cache_before = lm.meter.snapshot(), cache.stats()
+    agent_row = timed_run(lambda q: init_agent(chat).invoke({"input": q}), questions)
+    agent_row["tokens"] = {"agent_llm": chat_meter.snapshot(), "dspy_lm": _delta(lm.meter.snapshot(), before)}
+    agent_row["cache"] = _cache_delta(cache.stats(), cache_before)
+    report["agent"] = agent_row
+
+    # Streaming agent: time to first final-answer token vs. full completion.
+    from streaming import stream_agent
+
+    cache.clear()
+    stream_chat = StubChatModel(latency=args.lm_latency, completion_tokens=args.completion_tokens, streaming=True)
+    first_token: List[float] = []
+    done: List[float] = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        for q in questions:
+            start = time.perf_counter()
+            seen = False
+            for event in stream_agent(init_agent(stream_chat, verbose=False), q):
+                if event["type"] == "token" and not seen:
+                    first_token.append(time.perf_counter() - start)
+                    seen = True
+            done.append(time.perf_counter() - start)
+    report["agent_stream"] = {
+        "ttft_p50_ms": round(1000 * percentile(first_token, 50), 3),
+        "ttft_p95_ms": round(1000 * percentile(first_token, 95), 3),
+        "total_p50_ms": round(1000 * percentile(done, 50), 3),
+    }
+
+    report["wikipedia_calls"] = dict(wiki.calls)
+    report["tokens_total"] = {"dspy_lm": lm.meter.snapshot(), "agent_llm": chat_meter.snapshot()}
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline WikiRAG / agent benchmark")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--lm-latency", type=float, default=0.2, help="Seconds per stub LM call")
+    parser.add_argument("--wiki-latency", type=float, default=0.02, help="Seconds per local wikipedia call")
+    parser.add_argument("--completion-tokens", type=int, default=120)
+    parser.add_argument("--repeat", type=int, default=1, help="Repeat the question set this many times")
+    parser.add_argument("--out", type=str, default="bench_report.json")
+    args = parser.parse_args()
+
+    report = run_benchmark(args)
+    with open(args.out, "w") as f:
+        json.dump(report, f, indent=2, sort_keys=True)
+    print(json.dumps({
+        "rag_cold_p50_ms": report["rag_latency"]["cold"]["p50_ms"],
+        "rag_warm_p50_ms": report["rag_latency"]["warm"]["p50_ms"],
+        "agent_p95_ms": report["agent"]["p95_ms"],
+        "agent_stream_ttft_p50_ms": report["agent_stream"]["ttft_p50_ms"],
+        "throughput_qps": {f'{r["mode"]}@{r["concurrency"]}': r["throughput_qps"] for r in report["rag_throughput"]},
+    }, indent=2))
+    print(f"Report written to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,30 @@
 import os
+import sys
 from typing import Optional
 
 from dotenv import load_dotenv  # type: ignore
 import dspy as dspy  # type: ignore
 
+try:
+    from backend.openai_governor import estimate_tokens, get_governor
+except ImportError:
+    # Fallback when run as a standalone script: add the repo root to path
+    sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+    from backend.openai_governor import estimate_tokens, get_governor
+
+
+class GovernedLM(dspy.LM):
+    """dspy.LM whose calls go through the shared OpenAI governor (rate limits, priority, 429 backoff)."""
+
+    def __init__(self, model: str, **kwargs):
+        kwargs.setdefault("num_retries", 0)  # the governor owns retries
+        super().__init__(model=model, **kwargs)
+
+    def __call__(self, prompt=None, messages=None, **kwargs):
+        parent = super().__call__
+        tokens = estimate_tokens(messages or prompt or "")
+        return get_governor().call(lambda: parent(prompt=prompt, messages=messages, **kwargs), tokens=tokens)
+
 
 def init_lm(model_name: Optional[str] = None, api_key_env: str = "OPENAI_API_KEY", temperature: float = 0.2):
     """Initialize DSPy's LM with sensible defaults.
@@ -18,7 +39,7 @@ def init_lm(model_name: Optional[str] = None, api_key_env: str = "OPENAI_API_KEY
 
     # OpenAI-style LM through DSPy. You can swap providers (e.g., Azure, Groq) if needed.
     # DSPy picks provider from environment by default; this sets the model string and args.
-    lm = dspy.LM(model=resolved_model, api_key=os.getenv(api_key_env), temperature=temperature)
+    lm = GovernedLM(model=resolved_model, api_key=os.getenv(api_key_env), temperature=temperature)
     # Configure DSPy globally
     dspy.configure(lm=lm)
     return lm
@@ -0,0 +1,145 @@
+"""Streaming wrappers for the LangChain Wiki agent.
+
+`stream_agent` (sync generator) and `astream_agent` (async iterator) yield
+events as the ReAct loop produces them, instead of waiting for the whole run:
+
+- {"type": "tool_start", "tool": ..., "input": ...}
+- {"type": "tool_end", "output": ...}
+- {"type": "tool_error", "error": ...}
+- {"type": "token", "text": ...}      final-answer tokens, as the LLM streams them
+- {"type": "final", "output": ...}
+
+Final-answer tokens need a streaming LLM, e.g. `init_lm(streaming=True)`.
+"""
+from __future__ import annotations
+
+import asyncio
+import queue
+import threading
+from typing import Any, AsyncIterator, Callable, Dict, Iterator
+
+from langchain_core.agents import AgentAction, AgentFinish
+from langchain_core.callbacks import BaseCallbackHandler
+
+FINAL_ANSWER_PREFIX = "Final Answer:"
+
+Event = Dict[str, Any]
+
+
+class AgentEventHandler(BaseCallbackHandler):
+    """Turn agent callbacks into events passed to `emit`.
+
+    LLM tokens are held back until the ReAct "Final Answer:" marker shows up in
+    the current generation; everything after it is emitted as it arrives.
+    """
+
+    run_inline = True  # keep events in order under the async executor
+
+    def __init__(self, emit: Callable[[Event], None]):
+        self.emit = emit
+        self._reset()
+
+    def on_llm_start(self, *args: Any, **kwargs: Any) -> None:
+        self._reset()
+
+    def on_chat_model_start(self, *args: Any, **kwargs: Any) -> None:
+        self._reset()
+
+    def on_llm_new_token(self, token: str, **kwargs: Any) -> None:
+        if not self._in_final:
+            self._buffer += token
+            idx = self._buffer.find(FINAL_ANSWER_PREFIX)
+            if idx < 0:
+                return
+            self._in_final = True
+            token = self._buffer[idx + len(FINAL_ANSWER_PREFIX):]
+        if not self._started:
+            token = token.lstrip()
+            self._started = bool(token)
+        if token:
+            self.emit({"type": "token", "text": token})
+
+    def on_agent_action(self, action: AgentAction, **kwargs: Any) -> None:
+        self.emit({"type": "tool_start", "tool": action.tool, "input": action.tool_input})
+
+    def on_tool_end(self, output: Any, **kwargs: Any) -> None:
+        self.emit({"type": "tool_end", "output": str(output)})
+
+    def on_tool_error(self, error: BaseException, **kwargs: Any) -> None:
+        self.emit({"type": "tool_error", "error": str(error)})
+
+    def on_agent_finish(self, finish: AgentFinish, **kwargs: Any) -> None:
+        self.emit({"type": "final", "output": finish.return_values.get("output", "")})
+
+    def _reset(self) -> None:
+        self._buffer = ""
+        self._in_final = False
+        self._started = False
+
+
+_DONE = object()
+
+
+def stream_agent(agent, input_text: str) -> Iterator[Event]:
+    """Run the agent on a worker thread and yield its events as they happen."""
+    events: "queue.Queue[Any]" = queue.Queue()
+    failure: Dict[str, BaseException] = {}
+
+    def run() -> None:
+        try:
+            agent.invoke({"input": input_text}, config={"callbacks": [AgentEventHandler(events.put)]})
+        except BaseException as e:
+            failure["error"] = e
+        finally:
+            events.put(_DONE)
+
+    worker = threading.Thread(target=run, name="agent-stream", daemon=True)
+    worker.start()
+    while True:
+        event = events.get()
+        if event is _DONE:
+            break
+        yield event
+    worker.join()
+    if "error" in failure:
+        raise failure["error"]
+
+
+async def astream_agent(agent, input_text: str) -> AsyncIterator[Event]:
+    """Async counterpart of `stream_agent`, driven by `agent.ainvoke`."""
+    loop = asyncio.get_running_loop()
+    events: "asyncio.Queue[Any]" = asyncio.Queue()
+
+    def emit(event: Event) -> None:
+        loop.call_soon_threadsafe(events.put_nowait, event)
+
+    task = asyncio.ensure_future(agent.ainvoke({"input": input_text}, config={"callbacks": [AgentEventHandler(emit)]}))
+    task.add_done_callback(lambda _: emit(_DONE))
+    try:
+        while True:
+            event = await events.get()
+            if event is _DONE:
+                break
+            yield event
+        task.result()
+    finally:
+        if not task.done():
+            task.cancel()
+
+
+def print_events(events: Iterator[Event]) -> None:
+    """Render an event stream to the terminal: tool calls on their own lines, answer tokens inline."""
+    streamed = False
+    for event in events:
+        kind = event["type"]
+        if kind == "tool_start":
+            print(f"\n[tool] {event['tool']}({event['input']!r})")
+        elif kind == "tool_error":
+            print(f"[tool error] {event['error']}")
+        elif kind == "token":
+            if not streamed:
+                print("\nAnswer: ", end="")
+                streamed = True
+            print(event["text"], end="", flush=True)
+        elif kind == "final":
+            print() if streamed else print(f"\nAnswer: {event['output']}")
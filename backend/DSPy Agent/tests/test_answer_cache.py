@@ -0,0 +1,47 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "tools"))
+
+from answer_cache import AnswerCache  # noqa: E402
+
+
+def _cached(stored: str, asked: str) -> AnswerCache:
+    cache = AnswerCache()
+    cache.put(stored, "cached answer")
+    assert cache.get(asked) is None
+    return cache
+
+
+def test_different_year_is_a_miss():
+    cache = _cached(
+        "What was the population of New York City in 2010 according to the US census?",
+        "What was the population of New York City in 2020 according to the US census?",
+    )
+    assert cache.stats()["near_hits"] == 0
+
+
+def test_different_place_is_a_miss():
+    _cached(
+        "Which team won the FIFA World Cup held in Qatar in 2022 and who scored in the final?",
+        "Which team won the FIFA World Cup held in Russia in 2022 and who scored in the final?",
+    )
+
+
+def test_negation_is_a_miss():
+    _cached("Who is the president of France?", "Who is not the president of France?")
+    _cached("Who is not the president of France?", "Who is the president of France?")
+
+
+def test_tense_is_a_miss():
+    _cached("Who is the president of France?", "Who was the president of France?")
+
+
+def test_filler_words_still_hit():
+    cache = AnswerCache()
+    cache.put("Who is the president of France?", "cached answer")
+    assert cache.get("Could you please tell me who is the president of France") == "cached answer"
+    assert cache.get("What's the capital of France?") is None
+    cache.put("What is the approximate population of the capital city of France in Europe?", "About 2.1 million")
+    assert cache.get("What is the approximate population of the capital city of France in Europe, exactly?") == "About 2.1 million"
+    assert cache.stats()["near_hits"] == 1
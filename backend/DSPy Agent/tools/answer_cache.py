@@ -0,0 +1,245 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, FrozenSet, List, Optional, Set, Tuple
+
+# ----------------------
+# Normalization
+# ----------------------
+
+# Only articles and politeness filler. Question words and tense auxiliaries
+# ("who is" vs "who was") change the answer, so they stay in the key.
+_STOPWORDS = {
+    "a", "an", "the", "please", "can", "could", "you", "tell", "me", "s",
+}
+
+_CONTRACTIONS = {"whats": "what is", "whos": "who is", "wheres": "where is", "whens": "when is"}
+
+# Words a near-duplicate may add or drop ("do you know who is ..." vs "who is ...").
+# Every other token (names, places, numbers, negations, question words) has to match
+# exactly, so a one-word edit in a long question is never answered from the cache.
+_SOFT_WORDS = {
+    "do", "does", "i", "know", "want", "to", "of", "in", "on", "at", "for", "about",
+    "some", "any", "there", "exactly", "really", "actually", "briefly", "currently",
+}
+
+_MERSENNE_PRIME = (1 << 61) - 1
+
+
+def normalize_question(question: str) -> str:
+    """Lowercase, strip punctuation and filler words so trivial rewordings share a key."""
+    text = re.sub(r"\b(what|who|where|when)[\u2019']?s\b", r"\1s", question.lower())
+    words = [w for word in re.findall(r"[a-z0-9]+", text) for w in _CONTRACTIONS.get(word, word).split()]
+    kept = [w for w in words if w not in _STOPWORDS]
+    return " ".join(kept or words)
+
+
+def _tokens(normalized: str) -> FrozenSet[str]:
+    return frozenset(normalized.split())
+
+
+def _content(tokens: FrozenSet[str]) -> FrozenSet[str]:
+    return tokens - _SOFT_WORDS
+
+
+def _stable_hash(token: str) -> int:
+    return int.from_bytes(hashlib.blake2b(token.encode(), digest_size=8).digest(), "big")
+
+
+def program_fingerprint(program: Any) -> str:
+    """Hash a DSPy program's saved state (demos, instructions) to detect recompiles."""
+    try:
+        state = program.dump_state()
+    except Exception:
+        state = repr(program)
+    blob = json.dumps(state, sort_keys=True, default=str)
+    return hashlib.sha256(blob.encode()).hexdigest()
+
+
+# ----------------------
+# Cache
+# ----------------------
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    near_hits: int = 0
+    misses: int = 0
+    stores: int = 0
+    evictions: int = 0
+    expirations: int = 0
+    invalidations: int = 0
+    lookup_seconds: float = 0.0
+
+    @property
+    def lookups(self) -> int:
+        return self.hits + self.near_hits + self.misses
+
+    @property
+    def hit_rate(self) -> float:
+        return (self.hits + self.near_hits) / self.lookups if self.lookups else 0.0
+
+
+@dataclass
+class _Entry:
+    tokens: FrozenSet[str]
+    bands: List[Tuple[int, Tuple[int, ...]]]
+    answer: str
+    created_at: float
+
+
+class AnswerCache:
+    """TTL + LRU answer cache with MinHash/LSH near-duplicate lookup.
+
+    Exact hits go through a dict on the normalized question. On a miss, the
+    question's MinHash bands pick candidate entries, and the best one is
+    returned if it has exactly the same content tokens (everything but
+    `_SOFT_WORDS`) and its token Jaccard similarity is at least `threshold`.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 2048,
+        ttl_seconds: float = 6 * 3600,
+        threshold: float = 0.9,
+        num_perm: int = 64,
+        bands: int = 16,
+    ):
+        if num_perm % bands:
+            raise ValueError("num_perm must be divisible by bands")
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.rows = num_perm // bands
+        rng = random.Random(0x5EED)  # fixed seed so signatures are stable across processes
+        self._perms = [(rng.randrange(1, _MERSENNE_PRIME), rng.randrange(0, _MERSENNE_PRIME)) for _ in range(num_perm)]
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._buckets: Dict[Tuple[int, Tuple[int, ...]], Set[str]] = {}
+        self._fingerprint: Optional[str] = None
+        self._lock = threading.Lock()
+        self._stats = CacheStats()
+
+    # -- public API --------------------------------------------------------
+
+    def get(self, question: str) -> Optional[str]:
+        start = time.perf_counter()
+        key = normalize_question(question)
+        now = time.monotonic()
+        with self._lock:
+            try:
+                entry = self._entries.get(key)
+                if entry is not None and self._expired(entry, now):
+                    self._remove(key)
+                    self._stats.expirations += 1
+                    entry = None
+                if entry is not None:
+                    self._entries.move_to_end(key)
+                    self._stats.hits += 1
+                    return entry.answer
+
+                match = self._nearest(key, now)
+                if match is not None:
+                    self._entries.move_to_end(match)
+                    self._stats.near_hits += 1
+                    return self._entries[match].answer
+
+                self._stats.misses += 1
+                return None
+            finally:
+                self._stats.lookup_seconds += time.perf_counter() - start
+
+    def put(self, question: str, answer: str) -> None:
+        if not answer:
+            return
+        key = normalize_question(question)
+        tokens = _tokens(key)
+        entry = _Entry(tokens=tokens, bands=self._bands(tokens), answer=answer, created_at=time.monotonic())
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = entry
+            for band in entry.bands:
+                self._buckets.setdefault(band, set()).add(key)
+            self._stats.stores += 1
+            while len(self._entries) > self.max_entries:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self._stats.evictions += 1
+
+    def set_fingerprint(self, fingerprint: str) -> None:
+        """Bind the cache to a compiled program; a different fingerprint drops every entry."""
+        with self._lock:
+            if self._fingerprint is not None and fingerprint != self._fingerprint:
+                self._clear()
+                self._stats.invalidations += 1
+            self._fingerprint = fingerprint
+
+    def clear(self) -> None:
+        with self._lock:
+            self._clear()
+            self._stats.invalidations += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            snapshot = asdict(self._stats)
+            snapshot.update(
+                size=len(self._entries),
+                lookups=self._stats.lookups,
+                hit_rate=round(self._stats.hit_rate, 4),
+                avg_lookup_ms=round(1000 * self._stats.lookup_seconds / self._stats.lookups, 4) if self._stats.lookups else 0.0,
+            )
+            return snapshot
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    # -- internals ---------------------------------------------------------
+
+    def _expired(self, entry: _Entry, now: float) -> bool:
+        return self.ttl_seconds > 0 and now - entry.created_at > self.ttl_seconds
+
+    def _signature(self, tokens: FrozenSet[str]) -> List[int]:
+        hashes = [_stable_hash(t) for t in tokens] or [0]
+        return [min((a * h + b) % _MERSENNE_PRIME for h in hashes) for a, b in self._perms]
+
+    def _bands(self, tokens: FrozenSet[str]) -> List[Tuple[int, Tuple[int, ...]]]:
+        sig = self._signature(tokens)
+        return [(i, tuple(sig[i * self.rows:(i + 1) * self.rows])) for i in range(self.num_perm // self.rows)]
+
+    def _nearest(self, key: str, now: float) -> Optional[str]:
+        tokens = _tokens(key)
+        content = _content(tokens)
+        candidates: Set[str] = set()
+        for band in self._bands(tokens):
+            candidates |= self._buckets.get(band, set())
+
+        best_key, best_score = None, 0.0
+        for cand in candidates:
+            entry = self._entries[cand]
+            if self._expired(entry, now) or _content(entry.tokens) != content:
+                continue
+            score = len(tokens & entry.tokens) / len(tokens | entry.tokens) if tokens | entry.tokens else 0.0
+            if score > best_score:
+                best_key, best_score = cand, score
+        return best_key if best_score >= self.threshold else None
+
+    def _remove(self, key: str) -> None:
+        entry = self._entries.pop(key)
+        for band in entry.bands:
+            bucket = self._buckets.get(band)
+            if bucket is not None:
+                bucket.discard(key)
+                if not bucket:
+                    del self._buckets[band]
+
+    def _clear(self) -> None:
+        self._entries.clear()
+        self._buckets.clear()
@@ -1,17 +1,26 @@
 from __future__ import annotations
 
+import contextvars
 import re
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
 from dataclasses import dataclass
-from typing import List
+from typing import Dict, Iterable, Iterator, List, Optional
 import os
 import dspy as dspy  # type: ignore
 import wikipedia  # type: ignore
 
+from config import GovernedLM  # also puts the repo root on sys.path for standalone runs
+from backend.openai_governor import PRIORITY_BATCH, request_priority
+from .answer_cache import AnswerCache, program_fingerprint
+from .retrieval_context import current_memo
+
 # ----------------------
 # Load LM
 # ----------------------
 
-dspy.configure(lm=dspy.LM(model="gpt-5", api_key=os.getenv("OPENAI_API_KEY"), temperature=1.0))
+# Respect an LM configured before import (e.g. the offline stub in benchmark.py).
+if dspy.settings.lm is None:
+    dspy.configure(lm=GovernedLM(model="gpt-5", api_key=os.getenv("OPENAI_API_KEY"), temperature=1.0))
 
 
 # ----------------------
@@ -46,22 +55,37 @@ def clean_text(text: str, max_len: int = 1200) -> str:
     return text
 
 
-def search_wikipedia(query: str, top_k: int = 5) -> List[str]:
-    """Search Wikipedia and return cleaned summaries/snippets of top results."""
+def _search_titles(query: str, top_k: int) -> List[str]:
     try:
-        titles = wikipedia.search(query, results=top_k) or []
+        return wikipedia.search(query, results=top_k) or []
     except Exception:
-        titles = []
+        return []
+
+
+def _page_summary(title: str) -> str:
+    try:
+        page = wikipedia.page(title, auto_suggest=False)
+        return clean_text(page.summary or "")
+    except Exception:
+        return ""
+
+
+def search_wikipedia(query: str, top_k: int = 5) -> List[str]:
+    """Search Wikipedia and return cleaned summaries/snippets of top results.
+
+    Inside a retrieval_scope, searches and page fetches are memoized for the scope.
+    """
+    memo = current_memo()
+    if memo is not None:
+        titles = memo.search(query, top_k, lambda: _search_titles(query, top_k))
+    else:
+        titles = _search_titles(query, top_k)
 
     snippets: List[str] = []
     for i, title in enumerate(titles):
-        try:
-            page = wikipedia.page(title, auto_suggest=False)
-            snippet = clean_text(page.summary or "")
-            if snippet:
-                snippets.append(f"[{i+1}] {title}: {snippet}")
-        except Exception:
-            continue
+        snippet = memo.summary(title, lambda: _page_summary(title)) if memo is not None else _page_summary(title)
+        if snippet:
+            snippets.append(f"[{i+1}] {title}: {snippet}")
     return snippets
 
 
@@ -92,9 +116,13 @@ class WikiRAG(dspy.Module):
 
     def forward(self, question: str) -> dspy.Prediction:
         passages = self.retriever(question)
-        pred = self.answerer(question=question, passages=passages)
+        pred = self.answer(question, passages)
         print("Using Wiki RAG")
         return pred
+
+    def answer(self, question: str, passages: List[str]) -> dspy.Prediction:
+        """Answer step only, for callers that already retrieved the passages."""
+        return self.answerer(question=question, passages=passages)
     
 def compile_rag(rag: WikiRAG) -> WikiRAG:
     """Few shot optimization for the WikiRAG module."""
@@ -116,6 +144,20 @@ def compile_rag(rag: WikiRAG) -> WikiRAG:
 
 RAG = compile_rag(WikiRAG(top_k=5))
 
+# Near-duplicate answer cache; rebinding to a recompiled RAG drops stale answers.
+ANSWER_CACHE = AnswerCache(
+    max_entries=int(os.getenv("WIKI_RAG_CACHE_SIZE", "2048")),
+    ttl_seconds=float(os.getenv("WIKI_RAG_CACHE_TTL", str(6 * 3600))),
+    threshold=float(os.getenv("WIKI_RAG_CACHE_THRESHOLD", "0.9")),
+)
+ANSWER_CACHE.set_fingerprint(program_fingerprint(RAG))
+
+def set_rag(program: WikiRAG) -> None:
+    """Swap in a (re)compiled program; cached answers from the old one are invalidated."""
+    global RAG
+    RAG = program
+    ANSWER_CACHE.set_fingerprint(program_fingerprint(program))
+
 def dspy_wiki_search(query: str) -> str:
     """Search Wikipedia"""
     passages = RAG.retriever(query)
@@ -123,9 +165,89 @@ def dspy_wiki_search(query: str) -> str:
 
 def dspy_wiki_rag(question: str, chat_history: str | None = None) -> str:
     """Answer a question using the WikiRAG pipeline. chat_history is optional."""
+    cached = ANSWER_CACHE.get(question)
+    if cached is not None:
+        return cached
     response = RAG(question)
+    ANSWER_CACHE.put(question, response.answer)
     return response.answer
 
+
+@dataclass
+class BatchAnswer:
+    index: int
+    question: str
+    answer: str
+    error: Optional[str] = None
+
+
+def _retrieval_key(query: str) -> str:
+    return " ".join(query.lower().split())
+
+
+def dspy_wiki_rag_batch(questions: Iterable[str], max_concurrency: int = 8) -> Iterator[BatchAnswer]:
+    """Answer many questions, yielding a BatchAnswer as each one completes (not in input order).
+
+    Cached answers are yielded first. Each unique retrieval query is fetched once,
+    identical questions share one answerer call, and retrieval and answering share
+    a pool of `max_concurrency` threads. Workers inherit the caller's retrieval_scope.
+    """
+    questions = list(questions)
+    by_question: Dict[str, List[int]] = {}
+    for i, q in enumerate(questions):
+        cached = ANSWER_CACHE.get(q)
+        if cached is not None:
+            yield BatchAnswer(index=i, question=q, answer=cached)
+        else:
+            by_question.setdefault(q.strip(), []).append(i)
+    if not by_question:
+        return
+
+    by_query: Dict[str, List[str]] = {}
+    for q in by_question:
+        by_query.setdefault(_retrieval_key(q), []).append(q)
+
+    rag = RAG
+    # Workers run in copies of this context, so their LM calls queue behind interactive traffic.
+    with request_priority(PRIORITY_BATCH):
+        context = contextvars.copy_context()
+
+    def submit(fn, *args) -> Future:
+        return pool.submit(context.copy().run, fn, *args)
+
+    pool = ThreadPoolExecutor(max_workers=max(1, max_concurrency), thread_name_prefix="wiki-rag")
+    try:
+        retrievals: Dict[Future, str] = {submit(rag.retriever, qs[0]): key for key, qs in by_query.items()}
+        answers: Dict[Future, str] = {}
+        while retrievals or answers:
+            done, _ = wait([*retrievals, *answers], return_when=FIRST_COMPLETED)
+            for fut in done:
+                if fut in retrievals:
+                    key = retrievals.pop(fut)
+                    try:
+                        passages = fut.result()
+                    except Exception as e:
+                        for q in by_query[key]:
+                            for i in by_question[q]:
+                                yield BatchAnswer(index=i, question=questions[i], answer="", error=f"retrieval failed: {e}")
+                        continue
+                    for q in by_query[key]:
+                        answers[submit(rag.answer, q, passages)] = q
+                    continue
+
+                q = answers.pop(fut)
+                try:
+                    answer, error = fut.result().answer, None
+                    ANSWER_CACHE.put(q, answer)
+                except Exception as e:
+                    answer, error = "", f"answer failed: {e}"
+                for i in by_question[q]:
+                    yield BatchAnswer(index=i, question=questions[i], answer=answer, error=error)
+    finally:
+        # A consumer that stops early (break / close()) must not wait for queued work.
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
 # # ----------------------
 # # Optimizer (optional in v1)
 # # ----------------------
@@ -0,0 +1,74 @@
+from __future__ import annotations
+
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+
+class RetrievalMemo:
+    """Per-conversation memo of Wikipedia lookups.
+
+    Holds search results per (query, top_k) and page summaries per title, so the
+    agent's search and RAG tools fetch each page at most once per conversation.
+    Empty results are not memoized: the fetch helpers return them on errors, and a
+    transient Wikipedia failure should not blank a query for the rest of the conversation.
+    """
+
+    def __init__(self):
+        self._searches: Dict[Tuple[str, int], List[str]] = {}
+        self._summaries: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def search(self, query: str, top_k: int, fetch: Callable[[], List[str]]) -> List[str]:
+        key = (" ".join(query.lower().split()), top_k)
+        return list(self._get_or_fetch(self._searches, key, fetch))
+
+    def summary(self, title: str, fetch: Callable[[], str]) -> str:
+        return self._get_or_fetch(self._summaries, title, fetch)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "searches": len(self._searches),
+                "pages": len(self._summaries),
+            }
+
+    def _get_or_fetch(self, store: dict, key, fetch: Callable):
+        with self._lock:
+            if key in store:
+                self.hits += 1
+                return store[key]
+            self.misses += 1
+        # Fetch outside the lock; a racing duplicate fetch is harmless.
+        value = fetch()
+        if not value:
+            return value
+        with self._lock:
+            store.setdefault(key, value)
+            return store[key]
+
+
+_ACTIVE_MEMO: ContextVar[Optional[RetrievalMemo]] = ContextVar("wiki_retrieval_memo", default=None)
+
+
+def current_memo() -> Optional[RetrievalMemo]:
+    return _ACTIVE_MEMO.get()
+
+
+@contextmanager
+def retrieval_scope(memo: Optional[RetrievalMemo] = None) -> Iterator[RetrievalMemo]:
+    """Share one RetrievalMemo with every Wikipedia lookup made inside the block.
+
+    Pass the same memo across turns to keep it for a whole conversation.
+    """
+    memo = memo or RetrievalMemo()
+    token = _ACTIVE_MEMO.set(memo)
+    try:
+        yield memo
+    finally:
+        _ACTIVE_MEMO.reset(token)
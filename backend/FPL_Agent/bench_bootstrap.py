@@ -0,0 +1,179 @@
+"""Compare parse time and peak memory of bootstrap-static ingestion paths.
+
+- legacy: decode the whole document (what `response.json()` did), then build the pool
+- json: `parse_bootstrap` without ijson (full decode, then reduce)
+- stream: `parse_bootstrap` with ijson (incremental, only teams/elements/events kept)
+
+With --bandwidth, the payload is also served from a local HTTP server capped at that many
+MB/s, and `get_player_pool` (streaming) is timed against `requests.get(...).json()`, which
+can only start parsing once the whole body has arrived.
+
+Uses a saved payload when given (curl -o bootstrap.json <FPL_BOOTSTRAP_URL>), otherwise a
+synthetic one shaped like the real document. Run from backend/:
+
+    python -m FPL_Agent.bench_bootstrap --payload bootstrap.json --repeat 5 --bandwidth 5
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import random
+import statistics
+import tempfile
+import time
+import threading
+import tracemalloc
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List
+
+import requests
+
+from . import fpl_data_client
+from .fpl_data_client import build_player_pool, get_player_pool, load_player_pool
+
+
+def synthetic_bootstrap(n_players: int = 750, seed: int = 0) -> Dict[str, Any]:
+    """Roughly the size and shape of a mid-season bootstrap-static (~100 fields per element)."""
+    rng = random.Random(seed)
+    stat_names = [f"stat_{i}" for i in range(70)]
+    return {
+        "chips": [{"id": i, "name": f"chip{i}", "number": 1, "start_event": 1, "stop_event": 38, "chip_type": "team", "overrides": {"rules": {}, "scoring": {}, "element_types": [], "pick_multiplier": None}} for i in range(8)],
+        "events": [{
+            "id": gw, "name": f"Gameweek {gw}", "deadline_time": "2025-08-15T17:30:00Z", "average_entry_score": rng.randint(30, 70),
+            "finished": gw < 8, "data_checked": gw < 8, "highest_scoring_entry": rng.randint(1, 10**7), "is_previous": gw == 7,
+            "is_current": gw == 8, "is_next": gw == 9, "chip_plays": [{"chip_name": c, "num_played": rng.randint(1, 10**6)} for c in ("bboost", "3xc", "freehit", "wildcard")],
+            "most_selected": rng.randint(1, n_players), "top_element_info": {"id": rng.randint(1, n_players), "points": rng.randint(5, 25)},
+        } for gw in range(1, 39)],
+        "game_settings": {f"setting_{i}": i for i in range(60)},
+        "phases": [{"id": i, "name": f"Phase {i}", "start_event": i, "stop_event": i + 3, "highest_score": None} for i in range(1, 12)],
+        "teams": [{
+            "code": t * 3, "draw": 0, "form": None, "id": t, "loss": 0, "name": f"Team {t}", "played": 0, "points": 0,
+            "position": t, "short_name": f"T{t:02d}", "strength": rng.randint(2, 5), "team_division": None, "unavailable": False,
+            "win": 0, **{f"strength_{k}": rng.randint(1000, 1400) for k in ("overall_home", "overall_away", "attack_home", "attack_away", "defence_home", "defence_away")},
+            "pulse_id": t,
+        } for t in range(1, 21)],
+        "total_players": 11000000,
+        "elements": [{
+            "id": i, "first_name": f"First{i}", "second_name": f"Second{i}", "web_name": f"Web{i}", "team": rng.randint(1, 20),
+            "element_type": rng.randint(1, 4), "now_cost": rng.randint(40, 150), "total_points": rng.randint(0, 120),
+            "status": rng.choice("aaaaaidsu"), "chance_of_playing_next_round": rng.choice([None, None, None, 0, 25, 50, 75, 100]),
+            "chance_of_playing_this_round": None, "news": rng.choice(["", "", "Knock - 75% chance of playing"]), "news_added": None,
+            "photo": f"{i}.jpg", "form": f"{rng.random() * 10:.1f}", "selected_by_percent": f"{rng.random() * 50:.1f}",
+            "ep_next": f"{rng.random() * 8:.1f}", "ep_this": f"{rng.random() * 8:.1f}", "points_per_game": f"{rng.random() * 8:.1f}",
+            **{name: rng.randint(0, 500) for name in stat_names},
+            "influence": f"{rng.random() * 500:.1f}", "creativity": f"{rng.random() * 500:.1f}", "threat": f"{rng.random() * 500:.1f}",
+            "ict_index": f"{rng.random() * 100:.1f}", "expected_goals": f"{rng.random() * 10:.2f}", "expected_assists": f"{rng.random() * 10:.2f}",
+        } for i in range(1, n_players + 1)],
+        "element_stats": [{"label": name.title(), "name": name} for name in stat_names],
+        "element_types": [{"id": t, "plural_name": p, "singular_name_short": p[:3].upper(), "squad_select": 5, "element_count": n_players // 4} for t, p in enumerate(("Goalkeepers", "Defenders", "Midfielders", "Forwards"), 1)],
+    }
+
+
+def legacy_player_pool(path: str):
+    with open(path, "rb") as f:
+        data = json.loads(f.read())  # bytes and the full dict alive together, like response.json()
+    return build_player_pool(data)
+
+
+def json_player_pool(path: str):
+    ijson, fpl_data_client.ijson = fpl_data_client.ijson, None
+    try:
+        return load_player_pool(path)
+    finally:
+        fpl_data_client.ijson = ijson
+
+
+def measure(fn: Callable[[str], List[Any]], path: str, repeat: int) -> Dict[str, Any]:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        pool = fn(path)
+        times.append(time.perf_counter() - start)
+    tracemalloc.start()
+    fn(path)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"median_ms": round(statistics.median(times) * 1000, 1), "peak_mb": round(peak / 2**20, 2), "players": len(pool)}
+
+
+def throttled_server(payload: bytes, bandwidth_mb_s: float) -> ThreadingHTTPServer:
+    """Serve `payload` at / in 16 KB chunks, paced to `bandwidth_mb_s`."""
+    chunk = 16 * 1024
+    delay = chunk / (bandwidth_mb_s * 2**20)
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            self.send_response(200)
+            self.send_header("content-type", "application/json")
+            self.send_header("content-length", str(len(payload)))
+            self.end_headers()
+            for i in range(0, len(payload), chunk):
+                self.wfile.write(payload[i:i + chunk])
+                time.sleep(delay)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def measure_network(path: str, bandwidth_mb_s: float, repeat: int) -> Dict[str, Any]:
+    with open(path, "rb") as f:
+        server = throttled_server(f.read(), bandwidth_mb_s)
+    url = f"http://127.0.0.1:{server.server_address[1]}/"
+    original, fpl_data_client.FPL_BOOTSTRAP_URL = fpl_data_client.FPL_BOOTSTRAP_URL, url
+
+    def legacy() -> List[Any]:
+        response = requests.get(url, timeout=30)
+        response.raise_for_status()
+        return build_player_pool(response.json())
+
+    try:
+        report: Dict[str, Any] = {"bandwidth_mb_s": bandwidth_mb_s}
+        for name, fn in (("legacy", legacy), ("stream", get_player_pool)):
+            times = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                fn()
+                times.append(time.perf_counter() - start)
+            report[name] = {"median_ms": round(statistics.median(times) * 1000, 1)}
+        return report
+    finally:
+        fpl_data_client.FPL_BOOTSTRAP_URL = original
+        server.shutdown()
+        server.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="bootstrap-static ingestion benchmark")
+    parser.add_argument("--payload", default=None, help="Saved bootstrap-static JSON (default: synthetic)")
+    parser.add_argument("--players", type=int, default=750, help="Synthetic payload size")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--bandwidth", type=float, default=None, help="Also time fetch + parse from a local server capped at this many MB/s")
+    args = parser.parse_args()
+
+    path = args.payload
+    if path is None:
+        fd, path = tempfile.mkstemp(suffix=".json")
+        with os.fdopen(fd, "w") as f:
+            json.dump(synthetic_bootstrap(args.players), f)
+    try:
+        paths = {"legacy": legacy_player_pool, "json": json_player_pool}
+        if fpl_data_client.ijson is not None:
+            paths["stream"] = load_player_pool
+        report = {"payload_mb": round(os.path.getsize(path) / 2**20, 2)}
+        report.update({name: measure(fn, path, args.repeat) for name, fn in paths.items()})
+        assert len({report[name]["players"] for name in paths}) == 1, report
+        if args.bandwidth:
+            report["network"] = measure_network(path, args.bandwidth, args.repeat)
+        print(json.dumps(report, indent=2))
+    finally:
+        if args.payload is None:
+            os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
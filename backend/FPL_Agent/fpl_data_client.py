@@ -1,7 +1,14 @@
-from typing import List
+import json
+from typing import Any, BinaryIO, Dict, List, Optional
 import requests
 from .schema import Player
 
+# Optional: stream bootstrap-static instead of decoding the whole document.
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
 FPL_BOOTSTRAP_URL = "https://fantasy.premierleague.com/api/bootstrap-static/"
 
 POSITION_MAP = {
@@ -11,30 +18,152 @@ POSITION_MAP = {
     4: "FWD"
 }
 
-def get_player_pool() -> List[Player]:
-    """Get the player pool from the FPL Data API"""
-    response = requests.get(FPL_BOOTSTRAP_URL, timeout=30)
-    response.raise_for_status()
-    data = response.json()
+# Element fields the pool and the snapshot store need; everything else in the payload is ignored.
+ELEMENT_FIELDS = (
+    "id",
+    "first_name",
+    "second_name",
+    "team",
+    "element_type",
+    "now_cost",
+    "total_points",
+    "status",
+    "chance_of_playing_next_round",
+)
+
+TEAM_FIELDS = ("id", "name")
+EVENT_FIELDS = ("id", "is_current")
+
+# The only parts of bootstrap-static we keep; events is needed for the current gameweek.
+BOOTSTRAP_SECTIONS = {"events": EVENT_FIELDS, "teams": TEAM_FIELDS, "elements": ELEMENT_FIELDS}
+
+# Sections that come before elements in the payload and are small; collected event by event.
+_HEAD_SECTIONS = ("events", "teams")
+# "teams.item.name" -> "name"
+_HEAD_FIELD_PREFIXES = {f"{section}.item.{name}": name for section in _HEAD_SECTIONS for name in BOOTSTRAP_SECTIONS[section]}
+_HEAD_ITEM_PREFIXES = {f"{section}.item": section for section in _HEAD_SECTIONS}
+_SCALAR_EVENTS = {"string", "number", "boolean", "null"}
+
+def _reduce(items: List[Dict[str, Any]], fields: tuple) -> List[Dict[str, Any]]:
+    # Reduce in place so each full item can be freed as soon as it has been copied.
+    reduced = []
+    for i, item in enumerate(items):
+        reduced.append({k: item.get(k) for k in fields})
+        items[i] = None
+    return reduced
+
+def _reduce_bootstrap(data: Dict[str, Any]) -> Dict[str, Any]:
+    sections = {section: data.pop(section, []) for section in BOOTSTRAP_SECTIONS}
+    data.clear()  # drop phases, element_stats... before building the reduced copies
+    return {section: _reduce(items, BOOTSTRAP_SECTIONS[section]) for section, items in sections.items()}
+
+class _HeadTap:
+    """File-like pass-through that also feeds what is read to an event parser collecting
+    the small sections (events, teams), and stops feeding once both are complete."""
+
+    def __init__(self, stream: BinaryIO):
+        self.stream = stream
+        self.sections: Dict[str, List[Dict[str, Any]]] = {section: [] for section in _HEAD_SECTIONS}
+        self._remaining = set(_HEAD_SECTIONS)
+        self._events = ijson.sendable_list()
+        self._parser = ijson.parse_coro(self._events, use_float=True)
+        self._item: Optional[Dict[str, Any]] = None
+
+    def read(self, size: int = -1) -> bytes:
+        if self._remaining:
+            # Small reads while the head is incomplete, so little of elements goes through the event parser.
+            size = 8 * 1024 if size < 0 else min(size, 8 * 1024)
+        chunk = self.stream.read(size)
+        if self._remaining and chunk:
+            self._parser.send(chunk)
+            self._consume()
+        return chunk
+
+    def _consume(self) -> None:
+        for prefix, event, value in self._events:
+            if event in _SCALAR_EVENTS:
+                if self._item is not None and prefix in _HEAD_FIELD_PREFIXES:
+                    self._item[_HEAD_FIELD_PREFIXES[prefix]] = value
+            elif event == "start_map" and prefix in _HEAD_ITEM_PREFIXES:
+                self._item = dict.fromkeys(BOOTSTRAP_SECTIONS[_HEAD_ITEM_PREFIXES[prefix]])
+            elif event == "end_map" and prefix in _HEAD_ITEM_PREFIXES:
+                self.sections[_HEAD_ITEM_PREFIXES[prefix]].append(self._item)
+                self._item = None
+            elif event == "end_array" and prefix in self._remaining:
+                self._remaining.discard(prefix)
+                if not self._remaining:
+                    break
+        del self._events[:]
 
+def parse_bootstrap(stream: BinaryIO) -> Dict[str, Any]:
+    """Read events, teams and elements from a bootstrap-static byte stream, keeping only
+    the fields in BOOTSTRAP_SECTIONS.
+
+    With ijson the document is parsed incrementally: elements are built one at a time by
+    ijson's C backend and reduced straight away, while the small events and teams sections
+    are picked out of the same bytes as they stream past. Everything else (phases,
+    element_stats, unused fields...) is dropped. Without ijson the whole document is
+    decoded first."""
+    if ijson is None:
+        return _reduce_bootstrap(json.loads(stream.read()))  # json.load keeps an extra copy alive while decoding
+
+    tap = _HeadTap(stream)
+    elements = [{k: e.get(k) for k in ELEMENT_FIELDS} for e in ijson.items(tap, "elements.item", use_float=True)]
+    return {**tap.sections, "elements": elements}
+
+def fetch_bootstrap() -> Dict[str, Any]:
+    """Fetch bootstrap-static, reduced to the sections and fields in BOOTSTRAP_SECTIONS"""
+    with requests.get(FPL_BOOTSTRAP_URL, timeout=30, stream=True) as response:
+        response.raise_for_status()
+        response.raw.decode_content = True  # let urllib3 undo gzip while we read
+        return parse_bootstrap(response.raw)
+
+def load_bootstrap(path: str) -> Dict[str, Any]:
+    """Read a saved bootstrap-static payload, reduced like fetch_bootstrap"""
+    with open(path, "rb") as f:
+        return parse_bootstrap(f)
+
+def current_gameweek(data: Dict[str, Any]) -> Optional[int]:
+    """Id of the current gameweek (None before the season starts)"""
+    for event in data.get("events", []):
+        if event.get("is_current"):
+            return event.get("id")
+    return None
+
+def element_to_player(e: Dict[str, Any], id_to_team: Dict[int, str]) -> Optional[Player]:
+    """Build a Player from a bootstrap element; None for unknown positions or teams"""
+    position = POSITION_MAP.get(e.get("element_type"))
+    team_name = id_to_team.get(e.get("team"))
+    if position is None or team_name is None:
+        return None
+    return Player(
+        id=e.get("id"),
+        name=f'{(e.get("first_name") or "").strip()} {(e.get("second_name") or "").strip()}'.strip(),
+        position=position,
+        team=team_name,
+        price=(e.get("now_cost") or 0) / 10,
+        points=e.get("total_points") or 0,
+    )
+
+def build_player_pool(data: Dict[str, Any]) -> List[Player]:
+    """Build the player pool from a bootstrap-static payload"""
     id_to_team = {team["id"]: team["name"] for team in data.get("teams", [])}
 
     player_pool: List[Player] = []
     for e in data.get("elements", []):
-        position = POSITION_MAP.get(e.get("element_type"))
-        team_name = id_to_team.get(e.get("team"))
-        if position is None or team_name is None:
-            continue
-        player_pool.append(Player(
-            id=e.get("id"),
-            name=f'{e.get("first_name", "").strip()} {e.get("second_name", "").strip()}'.strip(),
-            position=position,
-            team=team_name,
-            price=e.get("now_cost", 0) / 10,
-            points=e.get("total_points", 0),
-        ))
+        player = element_to_player(e, id_to_team)
+        if player is not None:
+            player_pool.append(player)
     return player_pool
 
+def get_player_pool() -> List[Player]:
+    """Get the player pool from the FPL Data API"""
+    return build_player_pool(fetch_bootstrap())
+
+def load_player_pool(path: str) -> List[Player]:
+    """Build the player pool from a saved bootstrap-static payload (offline runs and tests)"""
+    return build_player_pool(load_bootstrap(path))
+
 if __name__ == "__main__":
     player_pool = get_player_pool()
-    print(player_pool)
\ No newline at end of file
+    print(player_pool)
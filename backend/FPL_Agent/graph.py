@@ -4,8 +4,16 @@ from .schema import Constraints, Player
 from .fpl_data_client import get_player_pool
 from .optimizer_mcp.dspy_modules.squad_selector import Squad_Selector
 from .optimizer_mcp.dspy_modules.squad_validator import Squad_Validator
-from langchain_openai import ChatOpenAI
 import json
+import os
+import sys
+
+try:
+    from backend.openai_governor import GovernedChatOpenAI
+except ImportError:
+    # Fallback when FPL_Agent is imported from backend/: add the repo root to path
+    sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+    from backend.openai_governor import GovernedChatOpenAI
 
 class State(TypedDict, total=False):
     pool: List[Player]
@@ -45,7 +53,7 @@ def repair_squad(state:State) -> State:
     return {**state, "squad" : squad, "total_cost" : float(total_cost), "violations" : []}
 
 def llm_plan(state:State) -> State:
-    llm = ChatOpenAI(model="gpt-4o-mini", temperature=0.2)
+    llm = GovernedChatOpenAI(model="gpt-4o-mini", temperature=0.2)
     prompt = (
         "You are helping plan an FPL squad.\n"
         f"From the pool of players available: {state['pool']} and following constraints: {state['constraints']}, \n"
@@ -65,7 +73,7 @@ def llm_plan(state:State) -> State:
 def explain_squad(state: State) -> State:
     if state.get("violations"):
         return state
-    llm = ChatOpenAI(model="gpt-4o-mini", temperature=0.2)
+    llm = GovernedChatOpenAI(model="gpt-4o-mini", temperature=0.2)
     lines = [f"{p.name} - {p.position} - {p.team} - £{p.price}" for p in state["squad"]]
     prompt = (
         "You are helping explain an FPL squad.\n"
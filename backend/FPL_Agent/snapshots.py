@@ -0,0 +1,283 @@
+"""Gameweek delta snapshots of the FPL player pool.
+
+Between two bootstrap-static fetches usually only prices, points and availability
+move, for a small share of players. `SnapshotStore.update` diffs each fetch against
+the previous one, rebuilds `Player` objects only for the ids that changed, and keeps
+the compact per-gameweek deltas. Consumers (name indexes, sort orders, cached solver
+results) either subscribe to deltas or ask for `changed_since(version)` and patch
+just those ids instead of rebuilding from the whole pool.
+
+With a `directory`, the latest full snapshot and one JSONL file of deltas per
+gameweek are written there, so a restarted process diffs against the last fetch.
+"""
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from .fpl_data_client import ELEMENT_FIELDS, current_gameweek, element_to_player, fetch_bootstrap
+from .schema import Player
+
+Element = Dict[str, Any]
+
+
+@dataclass
+class PoolDelta:
+    """What changed between two consecutive fetches"""
+    version: int
+    gameweek: Optional[int]
+    fetched_at: float
+    added: Dict[int, Element] = field(default_factory=dict)  # id -> tracked fields
+    removed: List[int] = field(default_factory=list)
+    changed: Dict[int, Dict[str, Any]] = field(default_factory=dict)  # id -> {field: new value}; "team_name" on a team rename
+    teams: Dict[int, str] = field(default_factory=dict)  # renamed or new teams
+
+    @property
+    def changed_ids(self) -> Set[int]:
+        """Every id whose Player differs from the previous snapshot (added, removed or changed)"""
+        return set(self.added) | set(self.removed) | set(self.changed)
+
+    def is_empty(self) -> bool:
+        return not (self.added or self.removed or self.changed or self.teams)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, d: Dict[str, Any]) -> "PoolDelta":
+        # JSON turns int keys into strings
+        return cls(
+            version=d["version"],
+            gameweek=d.get("gameweek"),
+            fetched_at=d["fetched_at"],
+            added={int(k): v for k, v in d.get("added", {}).items()},
+            removed=list(d.get("removed", [])),
+            changed={int(k): v for k, v in d.get("changed", {}).items()},
+            teams={int(k): v for k, v in d.get("teams", {}).items()},
+        )
+
+
+def tracked_elements(elements: Iterable[Element]) -> Dict[int, Element]:
+    """Reduce raw bootstrap elements to the tracked fields, keyed by id"""
+    return {e["id"]: {k: e.get(k) for k in ELEMENT_FIELDS} for e in elements}
+
+
+def diff_elements(old: Dict[int, Element], new: Dict[int, Element]) -> Tuple[Dict[int, Element], List[int], Dict[int, Dict[str, Any]]]:
+    """(added, removed, changed) between two tracked element maps"""
+    added = {pid: e for pid, e in new.items() if pid not in old}
+    removed = sorted(pid for pid in old if pid not in new)
+    changed: Dict[int, Dict[str, Any]] = {}
+    for pid, e in new.items():
+        before = old.get(pid)
+        if before is None or before == e:
+            continue
+        changed[pid] = {k: v for k, v in e.items() if before.get(k) != v}
+    return added, removed, changed
+
+
+class SnapshotStore:
+    """Keeps the latest player pool and the deltas that led to it.
+
+    - `update(data)` diffs a bootstrap-static payload against the current snapshot,
+      returns the `PoolDelta` and notifies subscribers
+    - `players` is the current pool; unchanged `Player` objects are reused across updates
+    - `changed_since(version)` is the union of changed ids since a consumer last synced
+    - deltas are grouped by gameweek; only the last `max_gameweeks` stay in memory
+    """
+
+    def __init__(self, directory: Optional[str] = None, max_gameweeks: int = 5):
+        self.directory = directory
+        self.max_gameweeks = max_gameweeks
+        self.version = 0
+        self.gameweek: Optional[int] = None
+        self._elements: Dict[int, Element] = {}
+        self._teams: Dict[int, str] = {}
+        self._players: Dict[int, Player] = {}
+        self._deltas: Dict[Optional[int], List[PoolDelta]] = {}
+        self._subscribers: List[Callable[[PoolDelta], None]] = []
+        self._lock = threading.Lock()
+        if directory:
+            self._load()
+
+    # -- reading ----------------------------------------------------------------
+
+    @property
+    def players(self) -> List[Player]:
+        """Current pool in payload order"""
+        return list(self._players.values())
+
+    def player(self, player_id: int) -> Optional[Player]:
+        return self._players.get(player_id)
+
+    def deltas(self, gameweek: Optional[int] = None) -> List[PoolDelta]:
+        """Deltas recorded during `gameweek` (default: the current one)"""
+        return list(self._deltas.get(self.gameweek if gameweek is None else gameweek, []))
+
+    def changed_since(self, version: int) -> Optional[Set[int]]:
+        """Ids changed after `version`; None if those deltas are no longer held (rebuild instead)"""
+        if version >= self.version:
+            return set()
+        held = [d for deltas in self._deltas.values() for d in deltas if d.version > version]
+        if len(held) < self.version - version:
+            return None
+        ids: Set[int] = set()
+        for delta in held:
+            ids |= delta.changed_ids
+        return ids
+
+    def subscribe(self, callback: Callable[[PoolDelta], None]) -> None:
+        """Call `callback(delta)` after every update that changed something"""
+        self._subscribers.append(callback)
+
+    # -- updating ---------------------------------------------------------------
+
+    def update(self, data: Dict[str, Any]) -> PoolDelta:
+        teams = {team["id"]: team["name"] for team in data.get("teams", [])}
+        elements = tracked_elements(data.get("elements", []))
+        with self._lock:
+            delta = self._apply(elements, teams, current_gameweek(data))
+        if not delta.is_empty():
+            for callback in self._subscribers:
+                callback(delta)
+        return delta
+
+    def _apply(self, elements: Dict[int, Element], teams: Dict[int, str], gameweek: Optional[int]) -> PoolDelta:
+        added, removed, changed = diff_elements(self._elements, elements)
+        renamed = {tid: name for tid, name in teams.items() if self._teams.get(tid) != name}
+        if self._elements and renamed:
+            # A renamed team changes the Player of everyone in it.
+            for pid, e in elements.items():
+                if e["team"] in renamed and pid not in added:
+                    changed.setdefault(pid, {})["team_name"] = renamed[e["team"]]
+
+        delta = PoolDelta(
+            version=self.version + 1,
+            gameweek=gameweek,
+            fetched_at=time.time(),
+            added=added,
+            removed=removed,
+            changed=changed,
+            teams=renamed,
+        )
+        if gameweek is not None:
+            self.gameweek = gameweek
+        if delta.is_empty():
+            delta.version = self.version
+            return delta
+
+        rebuild = set(added) | set(changed)
+        self._players = {
+            pid: player
+            for pid, player in (
+                (pid, element_to_player(e, teams) if pid in rebuild else self._players.get(pid))
+                for pid, e in elements.items()
+            )
+            if player is not None
+        }
+        self._elements, self._teams = elements, teams
+        self.version = delta.version
+        self._record(delta)
+        if self.directory:
+            self._save_base()
+        return delta
+
+    def _record(self, delta: PoolDelta) -> None:
+        self._deltas.setdefault(delta.gameweek, []).append(delta)
+        while len(self._deltas) > self.max_gameweeks:
+            del self._deltas[next(iter(self._deltas))]
+        if self.directory:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(self._delta_path(delta.gameweek), "a") as f:
+                f.write(json.dumps(delta.to_dict(), separators=(",", ":")) + "\n")
+            self._prune_files()
+
+    # -- persistence ------------------------------------------------------------
+
+    def _base_path(self) -> str:
+        return os.path.join(self.directory, "base.json")
+
+    def _delta_path(self, gameweek: Optional[int]) -> str:
+        return os.path.join(self.directory, f"gw{gameweek if gameweek is not None else 'none'}.jsonl")
+
+    def _prune_files(self) -> None:
+        # Keep the delta files of the `max_gameweeks` most recently written gameweeks,
+        # including ones from before a restart that are no longer held in memory.
+        # Write time rather than gameweek number, so gw1 of a new season outranks gw38.
+        try:
+            names = [name for name in os.listdir(self.directory) if name.startswith("gw") and name.endswith(".jsonl")]
+        except OSError:
+            return
+        mtimes = {}
+        for path in (os.path.join(self.directory, name) for name in names):
+            try:
+                mtimes[path] = os.path.getmtime(path)
+            except OSError:
+                pass
+        keep = set(sorted(mtimes, key=mtimes.get, reverse=True)[:self.max_gameweeks])
+        if self.gameweek is not None:
+            keep.add(self._delta_path(self.gameweek))
+        for path in mtimes:
+            if path not in keep:
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+
+    def _save_base(self) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        blob = {
+            "version": self.version,
+            "gameweek": self.gameweek,
+            "teams": self._teams,
+            "elements": list(self._elements.values()),
+        }
+        tmp = f"{self._base_path()}.{os.getpid()}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(blob, f, separators=(",", ":"))
+        os.replace(tmp, self._base_path())
+
+    def _load(self) -> None:
+        try:
+            with open(self._base_path()) as f:
+                blob = json.load(f)
+        except (OSError, ValueError):
+            return
+        self.version = blob.get("version", 0)
+        self.gameweek = blob.get("gameweek")
+        self._teams = {int(k): v for k, v in blob.get("teams", {}).items()}
+        self._elements = tracked_elements(blob.get("elements", []))
+        for pid, e in self._elements.items():
+            player = element_to_player(e, self._teams)
+            if player is not None:
+                self._players[pid] = player
+        if self.gameweek is not None:
+            try:
+                with open(self._delta_path(self.gameweek)) as f:
+                    self._deltas[self.gameweek] = [PoolDelta.from_dict(json.loads(line)) for line in f if line.strip()]
+            except (OSError, ValueError):
+                pass
+        self._prune_files()
+
+
+_STORE: Optional[SnapshotStore] = None
+_STORE_LOCK = threading.Lock()
+
+
+def get_snapshot_store() -> SnapshotStore:
+    """Shared store; FPL_SNAPSHOT_DIR enables persistence"""
+    global _STORE
+    with _STORE_LOCK:
+        if _STORE is None:
+            _STORE = SnapshotStore(directory=os.getenv("FPL_SNAPSHOT_DIR") or None)
+        return _STORE
+
+
+def refresh_player_pool(store: Optional[SnapshotStore] = None) -> Tuple[List[Player], PoolDelta]:
+    """Fetch bootstrap-static into the store; returns (pool, delta)"""
+    store = store or get_snapshot_store()
+    delta = store.update(fetch_bootstrap())
+    return store.players, delta
@@ -0,0 +1,216 @@
+"""Benchmark parse_html backends against the original BeautifulSoup implementation.
+
+Runs every saved page in fixtures/pages/ (rendered DoorDash search results; save
+real ones with DOORDASH_SAVE_PAGES=<dir>) through each backend and reports the
+median time per page and whether the results match the legacy parser's output
+once duplicates are dropped. Run from this directory:
+
+    python bench_parse_html.py --repeat 20 --out parse_html_report.json
+    python bench_parse_html.py --write-fixtures   # regenerate the synthetic pages
+"""
+from __future__ import annotations
+
+import argparse
+import contextlib
+import glob
+import io
+import json
+import os
+import random
+import statistics
+import time
+from typing import Any, Callable, Dict, List
+
+from bs4 import BeautifulSoup
+
+from tools import PARSER_BACKENDS, parse_html
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "pages")
+
+
+def legacy_parse_html(html: str) -> list[dict]:
+    """parse_html as it was before the fast path (html.parser, one print per link)."""
+    print(f"Parsing HTML")
+    soup = BeautifulSoup(html, "html.parser")
+    title = soup.find('title')
+    if title:
+        print(f"Page title: {title.get_text()}")
+    results = []
+    store_links = soup.find_all("a", href=True)
+    for link in store_links:
+        href = link.get('href', '')
+        if isinstance(href, str) and '/store/' in href:
+            text = link.get_text(strip=True)
+            if text and len(text) > 3:
+                if '?' in href:
+                    href = href.split('?')[0]
+                if '#' in href:
+                    href = href.split('#')[0]
+                if not href.startswith('http'):
+                    href = f"https://www.doordash.com{href}"
+                results.append({"text": text, "link": href, "type": "restaurant"})
+                print(f"Found restaurant: {text} -> {href}")
+    if not results:
+        print("No store links found, looking for restaurant-like links...")
+        restaurant_keywords = ['pizza', 'restaurant', 'food', 'delivery', 'takeout', 'dine']
+        for link in store_links:
+            href = link.get('href', '')
+            text = link.get_text(strip=True)
+            if text and len(text) > 3 and not text.lower() in ['doordash', 'back home', 'home', 'search']:
+                text_lower = text.lower()
+                if any(keyword in text_lower for keyword in restaurant_keywords):
+                    if isinstance(href, str) and not href.startswith('http'):
+                        href = f"https://www.doordash.com{href}"
+                    results.append({"text": text, "link": href, "type": "potential_restaurant"})
+                    print(f"Found potential restaurant: {text} -> {href}")
+    print(f"Total restaurant results found: {len(results)}")
+    if len(results) > 0:
+        print("Restaurant results:")
+        for i, result in enumerate(results[:10]):
+            print(f"  {i+1}. {result['text']} -> {result['link']}")
+    return results
+
+
+def dedupe(results: list[dict]) -> list[dict]:
+    seen, unique = set(), []
+    for result in results:
+        if result["link"] not in seen:
+            seen.add(result["link"])
+            unique.append(result)
+    return unique
+
+
+# ----------------------
+# Synthetic fixture pages
+# ----------------------
+
+CUISINES = ["Pizza", "Sushi", "Tacos", "Burgers", "Thai", "Ramen", "Pho", "Curry", "Falafel", "BBQ"]
+WORDS = ["Golden", "Little", "Star", "Tony's", "Corner", "Mission", "Bay", "Sunset", "Union", "North Beach"]
+
+
+def render_search_page(n_stores: int, seed: int = 0, with_store_links: bool = True) -> str:
+    """A rendered search page shaped like DoorDash's: every store appears as an image
+    card and a name link (often twice, carousel + list), inside deep div soup, with a
+    large hydration script and navigation around it."""
+    rng = random.Random(seed)
+    cards = []
+    for i in range(n_stores):
+        name = f"{rng.choice(WORDS)} {rng.choice(CUISINES)} {i}"
+        slug = name.lower().replace("'", "").replace(" ", "-")
+        href = f"/store/{slug}-san-francisco-{100000 + i}/{200000 + i}/?cursor=eyJ{rng.getrandbits(64):x}&pickup=false" if with_store_links else f"/cuisine/{slug}/"
+        rating = f"{rng.uniform(3.5, 5):.1f}"
+        cards.append(
+            f'<div class="sc-card StoreCard" data-anchor-id="StoreCard" data-testid="store-{i}">'
+            f'<div class="sc-img"><a href="{href}" aria-hidden="true"><div><img src="https://img.cdn4dd.com/{slug}.jpg" alt="" loading="lazy"></div></a></div>'
+            f'<div class="sc-body"><div class="sc-row"><a href="{href}"><span class="Text">{name}</span> <span class="Badge">Pizza delivery</span></a></div>'
+            f'<div class="sc-meta"><span>{rating}</span><span>({rng.randint(50, 9000)}+)</span><span>&#8226;</span>'
+            f'<span>{rng.randint(0, 9)}.{rng.randint(0, 9)} mi</span><span>{rng.randint(15, 55)} min</span></div>'
+            f'<div class="sc-fee"><span>$0 delivery fee over $12</span></div></div></div>'
+        )
+    carousel = cards[: max(1, n_stores // 4)]  # featured stores repeat above the list
+    hydration = json.dumps({"stores": [{"id": i, "blob": "x" * 100} for i in range(n_stores)]})
+    nav = "".join(f'<a href="/{w.lower()}/">{w}</a>' for w in ["Home", "Search", "Orders", "Account", "Back Home", "DoorDash"])
+    footer = "".join(f'<li><a href="/about/{i}">About link {i}</a></li>' for i in range(60))
+    return (
+        "<!DOCTYPE html><html><head><title>Pizza Delivery Near Me | DoorDash</title>"
+        f'<script id="__NEXT_DATA__" type="application/json">{hydration}</script></head><body>'
+        f"<header><nav>{nav}</nav></header><main>"
+        f'<section class="carousel">{"".join(carousel)}</section>'
+        f'<section class="results">{"".join(cards)}</section>'
+        f"</main><footer><ul>{footer}</ul></footer></body></html>"
+    )
+
+
+SYNTHETIC_PAGES = {
+    "search_small.html": dict(n_stores=20, seed=1),
+    "search_medium.html": dict(n_stores=120, seed=2),
+    "search_large.html": dict(n_stores=400, seed=3),
+    "cuisine_no_store_links.html": dict(n_stores=120, seed=4, with_store_links=False),
+}
+
+
+def write_fixtures(directory: str = FIXTURE_DIR) -> None:
+    os.makedirs(directory, exist_ok=True)
+    for name, kwargs in SYNTHETIC_PAGES.items():
+        with open(os.path.join(directory, name), "w") as f:
+            f.write(render_search_page(**kwargs))
+        print(f"wrote {os.path.join(directory, name)}")
+
+
+# ----------------------
+# Benchmark
+# ----------------------
+
+def time_parser(fn: Callable[[str], list], html: str, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(html)
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples)
+
+
+def run_benchmark(pages: List[str], repeat: int) -> Dict[str, Any]:
+    report: Dict[str, Any] = {"backends": list(PARSER_BACKENDS), "repeat": repeat, "pages": []}
+    for path in pages:
+        with open(path, encoding="utf-8") as f:
+            html = f.read()
+        # The legacy version prints every link; count that cost but keep the terminal clean.
+        with contextlib.redirect_stdout(io.StringIO()):
+            expected = legacy_parse_html(html)
+            legacy_s = time_parser(legacy_parse_html, html, repeat)
+        entry: Dict[str, Any] = {
+            "page": os.path.basename(path),
+            "bytes": len(html.encode()),
+            "legacy": {"median_ms": round(legacy_s * 1000, 3), "results": len(expected)},
+        }
+        for backend in PARSER_BACKENDS:
+            got = parse_html(html, backend=backend)
+            seconds = time_parser(lambda h: parse_html(h, backend=backend), html, repeat)
+            entry[backend] = {
+                "median_ms": round(seconds * 1000, 3),
+                "results": len(got),
+                "speedup": round(legacy_s / seconds, 1) if seconds else None,
+                "matches_legacy": got == dedupe(expected),
+            }
+        report["pages"].append(entry)
+    return report
+
+
+def print_report(report: Dict[str, Any]) -> None:
+    columns = ["legacy", *report["backends"]]
+    print(f"{'page':<32}{'KB':>8}" + "".join(f"{c + ' ms':>16}" for c in columns))
+    for entry in report["pages"]:
+        row = f"{entry['page']:<32}{entry['bytes'] / 1024:>8.0f}"
+        for c in columns:
+            cell = f"{entry[c]['median_ms']:.2f}"
+            if c != "legacy":
+                cell += f" x{entry[c]['speedup']}" + ("" if entry[c]["matches_legacy"] else " !")
+            row += f"{cell:>16}"
+        print(row)
+    print("(xN = speedup over legacy, ! = results differ from deduplicated legacy output)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="parse_html backend benchmark")
+    parser.add_argument("--pages", nargs="+", default=None, help="HTML files (default: fixtures/pages/*.html)")
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--out", default=None, help="Write the JSON report here")
+    parser.add_argument("--write-fixtures", action="store_true", help="Regenerate the synthetic fixture pages and exit")
+    args = parser.parse_args()
+
+    if args.write_fixtures:
+        write_fixtures()
+        return
+    pages = args.pages or sorted(glob.glob(os.path.join(FIXTURE_DIR, "*.html")))
+    if not pages:
+        parser.error(f"no pages found; run with --write-fixtures or save some into {FIXTURE_DIR}")
+    report = run_benchmark(pages, args.repeat)
+    print_report(report)
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
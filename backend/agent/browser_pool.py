@@ -0,0 +1,214 @@
+import os
+import atexit
+import logging
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Callable, Deque, Iterator, Optional
+
+from selenium import webdriver
+from selenium.common.exceptions import WebDriverException
+
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
+
+USER_AGENT = "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+
+
+def chrome_options() -> webdriver.ChromeOptions:
+    # Configure Chrome options to avoid detection
+    options = webdriver.ChromeOptions()
+    options.add_argument("--headless")
+    options.add_argument("--no-sandbox")
+    options.add_argument("--disable-dev-shm-usage")
+    options.add_argument("--disable-blink-features=AutomationControlled")
+    options.add_experimental_option("excludeSwitches", ["enable-automation"])
+    options.add_experimental_option('useAutomationExtension', False)
+    options.add_argument(f"--user-agent={USER_AGENT}")
+    # Navigation returns immediately; tools wait explicitly for the elements they need,
+    # which lets search_doordash race several tabs without chromedriver blocking on loads.
+    options.page_load_strategy = "none"
+    return options
+
+
+def new_chrome() -> webdriver.Chrome:
+    driver = webdriver.Chrome(options=chrome_options())
+    # Remove webdriver property to avoid detection
+    driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
+    return driver
+
+
+class PooledBrowser:
+    def __init__(self, driver: webdriver.Chrome):
+        self.driver = driver
+        self.uses = 0
+        self.created_at = time.monotonic()
+
+
+class BrowserPool:
+    """Pool of long-lived WebDriver sessions.
+
+    - at most `max_sessions` browsers exist at once; checkout blocks for a free slot
+    - idle browsers are health-checked on checkout and replaced if dead
+    - a browser is recycled after `max_uses` checkouts or when its user reports a crash
+    - `warm()` pre-starts `min_idle` browsers so the first tool call skips startup;
+      a checkout that arrives while a warm browser is starting waits for it
+    """
+
+    def __init__(self, max_sessions: int = 2, max_uses: int = 50, min_idle: int = 1, factory: Callable[[], webdriver.Chrome] = new_chrome):
+        self.max_sessions = max_sessions
+        self.max_uses = max_uses
+        self.min_idle = min(min_idle, max_sessions)
+        self.factory = factory
+        self._idle: Deque[PooledBrowser] = deque()
+        self._slots = threading.BoundedSemaphore(max_sessions)
+        self._lock = threading.Lock()
+        self._warmed = threading.Condition(self._lock)  # signalled when a warm-up start finishes
+        self._warming = 0
+        self._closed = False
+        self.stats = {"created": 0, "reused": 0, "recycled": 0, "unhealthy": 0}
+
+    def warm(self) -> None:
+        """Start browsers until `min_idle` are idle (never above `max_sessions`)."""
+        while True:
+            with self._lock:
+                if self._closed or len(self._idle) + self._warming >= self.min_idle:
+                    return
+            if not self._slots.acquire(blocking=False):
+                return
+            with self._lock:
+                self._warming += 1
+            try:
+                browser = self._create()
+                with self._lock:
+                    self._idle.append(browser)
+            finally:
+                with self._lock:
+                    self._warming -= 1
+                    self._warmed.notify_all()
+                self._slots.release()
+
+    def checkout(self, timeout: Optional[float] = None) -> PooledBrowser:
+        if self._closed:
+            raise RuntimeError("BrowserPool is closed")
+        if not self._slots.acquire(timeout=timeout):
+            raise TimeoutError(f"No browser available within {timeout}s")
+        try:
+            while True:
+                with self._lock:
+                    # Rather than start a second Chrome, take the one warm() is starting.
+                    while not self._idle and self._warming:
+                        self._warmed.wait()
+                    browser = self._idle.popleft() if self._idle else None
+                if browser is None:
+                    return self._create()
+                if self._healthy(browser):
+                    self.stats["reused"] += 1
+                    return browser
+                self.stats["unhealthy"] += 1
+                self._quit(browser)
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def checkin(self, browser: PooledBrowser, broken: bool = False) -> None:
+        try:
+            browser.uses += 1
+            if broken or self._closed or browser.uses >= self.max_uses or not self._reset(browser):
+                self.stats["recycled"] += 1
+                self._quit(browser)
+                return
+            with self._lock:
+                self._idle.append(browser)
+        finally:
+            self._slots.release()
+
+    @contextmanager
+    def session(self, timeout: Optional[float] = None) -> Iterator[webdriver.Chrome]:
+        """Check out a driver; the browser is retired if it stops responding during the block.
+
+        Page-level errors (timeouts, missing or stale elements) keep a healthy browser.
+        """
+        browser = self.checkout(timeout=timeout)
+        broken = False
+        try:
+            yield browser.driver
+        except WebDriverException:
+            broken = not self._healthy(browser)
+            raise
+        finally:
+            self.checkin(browser, broken=broken)
+
+    def close(self) -> None:
+        self._closed = True
+        with self._lock:
+            idle, self._idle = list(self._idle), deque()
+        for browser in idle:
+            self._quit(browser)
+
+    def _create(self) -> PooledBrowser:
+        self.stats["created"] += 1
+        return PooledBrowser(self.factory())
+
+    @staticmethod
+    def _healthy(browser: PooledBrowser) -> bool:
+        try:
+            return browser.driver.execute_script("return 1") == 1
+        except Exception:
+            return False
+
+    @staticmethod
+    def _reset(browser: PooledBrowser) -> bool:
+        # Close tabs a caller left open; cookies and cache are kept on purpose.
+        try:
+            handles = browser.driver.window_handles
+            for handle in handles[1:]:
+                browser.driver.switch_to.window(handle)
+                browser.driver.close()
+            browser.driver.switch_to.window(handles[0])
+            return True
+        except Exception:
+            return False
+
+    @staticmethod
+    def _quit(browser: PooledBrowser) -> None:
+        try:
+            browser.driver.quit()
+        except Exception:
+            pass
+
+
+_POOL: Optional[BrowserPool] = None
+_POOL_LOCK = threading.Lock()
+
+
+def get_browser_pool() -> BrowserPool:
+    """Shared pool for the DoorDash tools, sized by DOORDASH_BROWSERS / DOORDASH_BROWSER_MAX_USES.
+
+    Created on first use (or by `warm_browser_pool()` at startup), and starts warming a
+    browser in the background right away.
+    """
+    global _POOL
+    with _POOL_LOCK:
+        if _POOL is None:
+            _POOL = BrowserPool(
+                max_sessions=int(os.getenv("DOORDASH_BROWSERS", "2")),
+                max_uses=int(os.getenv("DOORDASH_BROWSER_MAX_USES", "50")),
+            )
+            atexit.register(_POOL.close)
+            threading.Thread(target=_warm_quietly, args=(_POOL,), name="browser-pool-warm", daemon=True).start()
+        return _POOL
+
+
+def _warm_quietly(pool: BrowserPool) -> None:
+    try:
+        pool.warm()
+    except Exception as e:
+        # Not fatal: checkout starts a browser itself (and surfaces the error) when needed.
+        logger.warning("Could not pre-start a browser: %s", e)
+
+
+def warm_browser_pool() -> None:
+    """Startup hook: create the shared pool now so a browser is starting before the first search."""
+    get_browser_pool()
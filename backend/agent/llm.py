@@ -1,17 +1,51 @@
 import os
+import sys
 import json
+import asyncio
+import inspect
 import openai
 import dotenv
-from typing import Optional, List, Dict
+from typing import Any, Callable, Optional, List, Dict
+from response_cache import ResponseCache, message_to_dict
+
+try:
+    from backend.openai_governor import estimate_tokens, get_governor
+except ImportError:
+    # Fallback when run as a standalone script: add the repo root to path
+    sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+    from backend.openai_governor import estimate_tokens, get_governor
 
 dotenv.load_dotenv()
 openai.api_key = os.getenv("OPENAI_API_KEY")
 
+_TOOL_FUNCS: Optional[Dict[str, Callable[..., Any]]] = None
+
+def _tool_funcs() -> Dict[str, Callable[..., Any]]:
+    """Import the tool module once and cache the name -> function table."""
+    global _TOOL_FUNCS
+    if _TOOL_FUNCS is None:
+        import tools
+        _TOOL_FUNCS = {"search_doordash": tools.search_doordash, "parse_html": tools.parse_html}
+    return _TOOL_FUNCS
+
 class LLM:
-    def __init__(self, model_name: str = "gpt-4o-mini", temperature: float = 0.7):
+    # One AsyncOpenAI client (and its connection pool) shared by every instance.
+    _async_client: Optional[openai.AsyncOpenAI] = None
+
+    def __init__(self, model_name: str = "gpt-4o-mini", temperature: float = 0.7, cache: Optional[ResponseCache] = None, warm_browsers: Optional[bool] = None):
         self.model_name = model_name
         self.temperature = temperature
-        self.client = openai.OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+        # Configured from LLM_CACHE_* env vars by default; mode "off" unless set.
+        self.cache = cache if cache is not None else ResponseCache.from_env()
+        self._client: Optional[openai.OpenAI] = None
+
+        # Start a browser for search_doordash while the first completion is in flight.
+        # Off for replay runs (no network), or with DOORDASH_WARM_BROWSERS=0.
+        if warm_browsers is None:
+            warm_browsers = self.cache.mode != "replay" and os.getenv("DOORDASH_WARM_BROWSERS", "1") != "0"
+        if warm_browsers:
+            from browser_pool import warm_browser_pool
+            warm_browser_pool()
 
         # Optional: you can keep this for documentation in the system prompt,
         # but the actual tool wiring is done via the `tools` param below.
@@ -42,28 +76,70 @@ class LLM:
         {tool_call_str}
         """
 
+        # The tool schema and the formatted prompt never change, so build them once.
+        self.tools = self.tool_list()
+        tool_list_text = "\n".join([f"- {t['function']['name']}: {t['function']['description']}" for t in self.tools])
+        self.formatted_system_prompt = self.system_prompt.format(tool_list=tool_list_text, tool_call_str=self.tool_call_str)
+
+    @property
+    def client(self) -> openai.OpenAI:
+        # Created on first use so replay-only runs need no API key.
+        if self._client is None:
+            # Retries on 429 are owned by the shared governor, not the client.
+            self._client = openai.OpenAI(api_key=os.getenv("OPENAI_API_KEY"), max_retries=0)
+        return self._client
+
+    @classmethod
+    def async_client(cls) -> openai.AsyncOpenAI:
+        if cls._async_client is None:
+            cls._async_client = openai.AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"), max_retries=0)
+        return cls._async_client
+
+    def _request(self, prompt: str) -> dict:
+        return {
+            "model": self.model_name,
+            "messages": [{"role": "system", "content": self.formatted_system_prompt}, {"role": "user", "content": prompt}],
+            "tools": self.tools,
+            "tool_choice": "auto",
+            "temperature": self.temperature,
+        }
+
     def get_response_with_tools(self, prompt: str, tools: Optional[List[Dict]] = None):
-        tools = self.tool_list()
-        tool_list_text = "\n".join([f"- {t['function']['name']}: {t['function']['description']}" for t in tools])
-        system_prompt = self.system_prompt.format(tool_list=tool_list_text, tool_call_str=self.tool_call_str)
-
-        resp = self.client.chat.completions.create(
-            model=self.model_name,
-            messages=[{"role": "system", "content": system_prompt}, {"role": "user", "content": prompt}],
-            tools=tools,
-            tool_choice="auto",
-            temperature=self.temperature,
-        )
-
-        msg = resp.choices[0].message
-        if getattr(msg, "tool_calls", None):
+        request = self._request(prompt)
+        tokens = estimate_tokens(request["messages"])
+
+        def call() -> dict:
+            resp = get_governor().call(lambda: self.client.chat.completions.create(**request), tokens=tokens)
+            return message_to_dict(resp.choices[0].message)
+
+        msg = self.cache.fetch(request, call)
+
+        if msg["tool_calls"]:
             results = []
-            for tc in msg.tool_calls:
-                name = tc.function.name
-                args = json.loads(tc.function.arguments or "{}")
+            for tc in msg["tool_calls"]:
+                name = tc["name"]
+                args = json.loads(tc["arguments"] or "{}")
                 results.append(self.tool_response(name, args))
             return results[0] if len(results) == 1 else results
-        return msg.content
+        return msg["content"]
+
+    async def aget_response_with_tools(self, prompt: str, tools: Optional[List[Dict]] = None):
+        """Async get_response_with_tools: parallel tool calls run concurrently, so a turn costs the slowest tool."""
+        request = self._request(prompt)
+        tokens = estimate_tokens(request["messages"])
+
+        async def call() -> dict:
+            resp = await get_governor().acall(lambda: self.async_client().chat.completions.create(**request), tokens=tokens)
+            return message_to_dict(resp.choices[0].message)
+
+        msg = await self.cache.afetch(request, call)
+        if msg["tool_calls"]:
+            results = await asyncio.gather(*(
+                self.atool_response(tc["name"], json.loads(tc["arguments"] or "{}"))
+                for tc in msg["tool_calls"]
+            ))
+            return results[0] if len(results) == 1 else list(results)
+        return msg["content"]
 
     def tool_list(self) -> list[dict]:
         return [
@@ -100,14 +176,25 @@ class LLM:
         ]
 
     def tool_response(self, tool_name: str, tool_args: dict):
-        # Simple dispatcher; no need to change your tool functions
-        if tool_name == "search_doordash":
-            from tools import search_doordash
-            return search_doordash(**tool_args)
-        if tool_name == "parse_html":
-            from tools import parse_html
-            return parse_html(**tool_args)
-        raise ValueError(f"Unknown tool: {tool_name}")
+        # Simple dispatcher; no need to change your tool functions.
+        # Results are recorded with the completions, so replay never runs the tool itself.
+        func = _tool_funcs().get(tool_name)
+        if func is None:
+            raise ValueError(f"Unknown tool: {tool_name}")
+        return self.cache.run_tool(tool_name, tool_args, lambda: func(**tool_args))
+
+    async def atool_response(self, tool_name: str, tool_args: dict):
+        # Blocking tools (selenium, bs4) run in the default thread pool so they can overlap.
+        func = _tool_funcs().get(tool_name)
+        if func is None:
+            raise ValueError(f"Unknown tool: {tool_name}")
+
+        async def call():
+            if inspect.iscoroutinefunction(func):
+                return await func(**tool_args)
+            return await asyncio.to_thread(func, **tool_args)
+
+        return await self.cache.arun_tool(tool_name, tool_args, call)
 
 if __name__ == "__main__":
     user_input = input("Enter a prompt: ")
@@ -0,0 +1,213 @@
+import os
+import json
+import time
+import hashlib
+import threading
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+MODES = ("off", "record", "replay", "read_through")
+
+
+class CacheMiss(LookupError):
+    """Raised in replay mode when a request was never recorded."""
+
+
+def message_to_dict(msg: Any) -> dict:
+    """Reduce an OpenAI chat message to the JSON-safe parts we dispatch on."""
+    tool_calls = [
+        {"id": tc.id, "name": tc.function.name, "arguments": tc.function.arguments or "{}"}
+        for tc in (getattr(msg, "tool_calls", None) or [])
+    ]
+    return {"content": msg.content, "tool_calls": tool_calls}
+
+
+class ResponseCache:
+    """On-disk record/replay cache for chat completions.
+
+    Keyed by (model, temperature, messages, tools, tool_choice); one JSON file per key.
+
+    Modes:
+    - off: always call the API
+    - record: always call the API and overwrite the stored response
+    - replay: only serve stored responses; a miss raises CacheMiss (no network)
+    - read_through: serve stored responses, call the API and store on a miss
+
+    Requests with temperature above `max_temperature` bypass the cache, except in
+    replay mode, which never reaches the network. Once the
+    directory grows past `max_bytes`, least recently used entries are evicted.
+
+    Tool results go through `run_tool` and are stored next to the completions
+    (record and read_through), so replaying a recorded tool call returns its
+    recorded result instead of running the tool (browser, network) again.
+    """
+
+    def __init__(self, directory: str = ".llm_cache", mode: str = "off", max_bytes: int = 256 * 1024 * 1024, max_temperature: Optional[float] = None):
+        if mode not in MODES:
+            raise ValueError(f"Unknown cache mode: {mode} (expected one of {', '.join(MODES)})")
+        self.directory = directory
+        self.mode = mode
+        self.max_bytes = max_bytes
+        self.max_temperature = max_temperature
+        self.stats = {"hits": 0, "misses": 0, "writes": 0, "bypassed": 0, "evictions": 0}
+        self._size: Optional[int] = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> "ResponseCache":
+        max_temperature = os.getenv("LLM_CACHE_MAX_TEMPERATURE")
+        return cls(
+            directory=os.getenv("LLM_CACHE_DIR", ".llm_cache"),
+            mode=os.getenv("LLM_CACHE_MODE", "off"),
+            max_bytes=int(os.getenv("LLM_CACHE_MAX_BYTES", str(256 * 1024 * 1024))),
+            max_temperature=float(max_temperature) if max_temperature else None,
+        )
+
+    # -- keys / lookup -------------------------------------------------------
+
+    @staticmethod
+    def key(request: Dict[str, Any]) -> str:
+        fields = {k: request.get(k) for k in ("model", "temperature", "messages", "tools", "tool_choice")}
+        blob = json.dumps(fields, sort_keys=True, separators=(",", ":"), default=str)
+        return hashlib.sha256(blob.encode()).hexdigest()
+
+    @staticmethod
+    def tool_key(name: str, args: Dict[str, Any]) -> str:
+        blob = json.dumps({"tool": name, "arguments": args}, sort_keys=True, separators=(",", ":"), default=str)
+        return hashlib.sha256(blob.encode()).hexdigest()
+
+    def bypass(self, request: Dict[str, Any]) -> bool:
+        if self.mode == "off":
+            return True
+        if self.mode == "replay":
+            return False  # replay must never call the API
+        temperature = request.get("temperature") or 0.0
+        return self.max_temperature is not None and temperature > self.max_temperature
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], f"{key}.json")
+
+    def get(self, key: str) -> Optional[dict]:
+        path = self._path(key)
+        try:
+            with open(path) as f:
+                value = json.load(f)["response"]
+        except (OSError, ValueError, KeyError):
+            return None
+        try:
+            os.utime(path)  # mtime doubles as the LRU clock
+        except OSError:
+            pass
+        return value
+
+    def put(self, key: str, request: Dict[str, Any], response: dict) -> None:
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        blob = json.dumps({"request": request, "response": response, "created_at": time.time()}, default=str)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "w") as f:
+            f.write(blob)
+        os.replace(tmp, path)
+        with self._lock:
+            self.stats["writes"] += 1
+            # First write scans the directory (which now includes this entry); later writes add incrementally.
+            self._size = self._disk_usage() if self._size is None else self._size + len(blob)
+            if self._size > self.max_bytes:
+                self._evict()
+
+    # -- read-through entry points -------------------------------------------
+
+    def _lookup(self, request: Dict[str, Any]) -> Optional[dict]:
+        if self.mode == "record":
+            return None
+        cached = self.get(self.key(request))
+        with self._lock:
+            self.stats["hits" if cached is not None else "misses"] += 1
+        if cached is None and self.mode == "replay":
+            raise CacheMiss(f"No recorded response for request {self.key(request)[:12]} in {self.directory}")
+        return cached
+
+    def fetch(self, request: Dict[str, Any], call: Callable[[], dict]) -> dict:
+        if self.bypass(request):
+            with self._lock:
+                self.stats["bypassed"] += 1
+            return call()
+        cached = self._lookup(request)
+        if cached is not None:
+            return cached
+        response = call()
+        self.put(self.key(request), request, response)
+        return response
+
+    async def afetch(self, request: Dict[str, Any], call: Callable[[], Awaitable[dict]]) -> dict:
+        if self.bypass(request):
+            with self._lock:
+                self.stats["bypassed"] += 1
+            return await call()
+        cached = self._lookup(request)
+        if cached is not None:
+            return cached
+        response = await call()
+        self.put(self.key(request), request, response)
+        return response
+
+    # -- tool results -----------------------------------------------------------
+
+    def _replay_tool(self, name: str, args: Dict[str, Any]) -> Any:
+        key = self.tool_key(name, args)
+        cached = self.get(key)
+        with self._lock:
+            self.stats["hits" if cached is not None else "misses"] += 1
+        if cached is None:
+            raise CacheMiss(f"No recorded result for tool call {name} {key[:12]} in {self.directory}")
+        return cached
+
+    def _record_tool(self, name: str, args: Dict[str, Any], result: Any) -> None:
+        if self.mode in ("record", "read_through"):
+            self.put(self.tool_key(name, args), {"tool": name, "arguments": args}, result)
+
+    def run_tool(self, name: str, args: Dict[str, Any], call: Callable[[], Any]) -> Any:
+        """Result of a tool call: recorded in record/read_through mode, served from disk in replay mode."""
+        if self.mode == "replay":
+            return self._replay_tool(name, args)
+        result = call()
+        self._record_tool(name, args, result)
+        return result
+
+    async def arun_tool(self, name: str, args: Dict[str, Any], call: Callable[[], Awaitable[Any]]) -> Any:
+        if self.mode == "replay":
+            return self._replay_tool(name, args)
+        result = await call()
+        self._record_tool(name, args, result)
+        return result
+
+    # -- eviction -------------------------------------------------------------
+
+    def _entries(self):
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if name.endswith(".json"):
+                    path = os.path.join(root, name)
+                    try:
+                        st = os.stat(path)
+                    except OSError:
+                        continue
+                    yield st.st_mtime, st.st_size, path
+
+    def _disk_usage(self) -> int:
+        return sum(size for _, size, _ in self._entries())
+
+    def _evict(self) -> None:
+        # Drop least recently used entries until we are back under 90% of the budget.
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        target = int(self.max_bytes * 0.9)
+        for _, size, path in entries:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            self.stats["evictions"] += 1
+        self._size = total
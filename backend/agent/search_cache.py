@@ -0,0 +1,231 @@
+import os
+import re
+import json
+import time
+import sqlite3
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
+
+Results = List[dict]
+
+
+def normalize_key(search_term: str, location: str) -> str:
+    """Case, punctuation and spacing are ignored: ("Pizza ", "San Francisco, CA") == ("pizza", "san francisco ca")."""
+    def norm(text: str) -> str:
+        return " ".join(re.sub(r"[^\w\s]", " ", text.casefold()).split())
+    return f"{norm(search_term)}|{norm(location)}"
+
+
+class SearchCache:
+    """TTL cache for parsed DoorDash search results, keyed on the normalized (search_term, location).
+
+    - entries younger than `ttl_seconds` are served as is
+    - entries up to `stale_seconds` past the TTL are served immediately while one
+      background refresh replaces them (stale-while-revalidate)
+    - concurrent lookups of the same key share one fetch (single-flight)
+    - empty results are never cached, so a failed or blocked search is retried next time
+    - the in-process LRU holds `max_entries`; with `path` set, entries are also kept in
+      sqlite so they survive restarts and are shared by processes on the same host
+    """
+
+    def __init__(self, ttl_seconds: float = 15 * 60, stale_seconds: float = 60 * 60, max_entries: int = 512, path: Optional[str] = None):
+        self.ttl_seconds = ttl_seconds
+        self.stale_seconds = stale_seconds
+        self.max_entries = max_entries
+        self.path = path
+        self._entries: "OrderedDict[str, Tuple[float, Results]]" = OrderedDict()
+        self._inflight: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "stale_hits": 0, "misses": 0, "coalesced": 0, "refreshes": 0, "store_hits": 0, "empty_not_cached": 0, "errors": 0}
+        if path:
+            self._init_store()
+
+    @classmethod
+    def from_env(cls) -> "SearchCache":
+        return cls(
+            ttl_seconds=float(os.getenv("DOORDASH_CACHE_TTL", str(15 * 60))),
+            stale_seconds=float(os.getenv("DOORDASH_CACHE_STALE", str(60 * 60))),
+            max_entries=int(os.getenv("DOORDASH_CACHE_SIZE", "512")),
+            path=os.getenv("DOORDASH_CACHE_PATH") or None,
+        )
+
+    # -- lookup ---------------------------------------------------------------
+
+    def get(self, search_term: str, location: str, fetch: Callable[[], Results]) -> Results:
+        """Cached results for the search, calling `fetch` on a miss."""
+        if self.ttl_seconds <= 0:
+            return fetch()
+        key = normalize_key(search_term, location)
+        entry = self._lookup(key)
+        if entry is not None:
+            age = time.time() - entry[0]
+            if age < self.ttl_seconds:
+                self._count("hits")
+                return _copy(entry[1])
+            if age < self.ttl_seconds + self.stale_seconds:
+                self._count("stale_hits")
+                self._refresh_in_background(key, fetch)
+                return _copy(entry[1])
+        future, owner = self._join(key)
+        if owner:
+            self._count("misses")
+            self._run(key, fetch, future)
+        else:
+            self._count("coalesced")
+        return _copy(future.result())
+
+    def _join(self, key: str) -> Tuple[Future, bool]:
+        # Returns the in-flight fetch for `key`, and whether the caller has to run it.
+        with self._lock:
+            future = self._inflight.get(key)
+            if future is not None:
+                return future, False
+            future = self._inflight[key] = Future()
+            return future, True
+
+    def _run(self, key: str, fetch: Callable[[], Results], future: Future) -> None:
+        try:
+            results = fetch()
+        except BaseException as e:
+            self._count("errors")
+            future.set_exception(e)
+            raise
+        else:
+            if results:
+                self.put(key, results)
+            else:
+                self._count("empty_not_cached")
+            future.set_result(results)
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def _refresh_in_background(self, key: str, fetch: Callable[[], Results]) -> None:
+        future, owner = self._join(key)
+        if not owner:
+            return  # a refresh (or a miss) is already fetching this key
+
+        def refresh() -> None:
+            self._count("refreshes")
+            try:
+                self._run(key, fetch, future)
+            except Exception as e:
+                logger.warning("Background refresh of %r failed: %s", key, e)
+
+        threading.Thread(target=refresh, name="search-cache-refresh", daemon=True).start()
+
+    def _lookup(self, key: str) -> Optional[Tuple[float, Results]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                return entry
+        entry = self._load(key) if self.path else None
+        if entry is not None:
+            self._count("store_hits")
+            self._remember(key, entry)
+        return entry
+
+    # -- storage ----------------------------------------------------------------
+
+    def put(self, key: str, results: Results, stored_at: Optional[float] = None) -> None:
+        entry = (time.time() if stored_at is None else stored_at, _copy(results))
+        self._remember(key, entry)
+        if self.path:
+            self._save(key, entry)
+
+    def _remember(self, key: str, entry: Tuple[float, Results]) -> None:
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        # One short-lived connection per operation keeps this safe across threads.
+        conn = sqlite3.connect(self.path, timeout=5)
+        try:
+            with conn:  # commit, or roll back on error
+                yield conn
+        finally:
+            conn.close()
+
+    def _init_store(self) -> None:
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS search_results (key TEXT PRIMARY KEY, stored_at REAL NOT NULL, results TEXT NOT NULL)")
+
+    def _load(self, key: str) -> Optional[Tuple[float, Results]]:
+        try:
+            with self._connect() as conn:
+                row = conn.execute("SELECT stored_at, results FROM search_results WHERE key = ?", (key,)).fetchone()
+        except sqlite3.Error as e:
+            logger.warning("Search cache store unavailable: %s", e)
+            return None
+        if row is None or time.time() - row[0] >= self.ttl_seconds + self.stale_seconds:
+            return None
+        return row[0], json.loads(row[1])
+
+    def _save(self, key: str, entry: Tuple[float, Results]) -> None:
+        try:
+            with self._connect() as conn:
+                conn.execute("INSERT OR REPLACE INTO search_results (key, stored_at, results) VALUES (?, ?, ?)", (key, entry[0], json.dumps(entry[1])))
+                # Keep the store bounded: anything past the stale window can never be served.
+                conn.execute("DELETE FROM search_results WHERE stored_at < ?", (time.time() - self.ttl_seconds - self.stale_seconds,))
+        except sqlite3.Error as e:
+            logger.warning("Could not persist search results: %s", e)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+        if self.path:
+            with self._connect() as conn:
+                conn.execute("DELETE FROM search_results")
+
+    # -- reporting ----------------------------------------------------------------
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self._stats[name] += 1
+
+    def stats(self) -> dict:
+        """Counters plus hit rates; coalesced lookups count as hits since they skip a browser run."""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = len(self._entries)
+        lookups = stats["hits"] + stats["stale_hits"] + stats["misses"] + stats["coalesced"]
+        stats["lookups"] = lookups
+        stats["hit_rate"] = (stats["hits"] + stats["stale_hits"] + stats["coalesced"]) / lookups if lookups else 0.0
+        stats["fresh_hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
+
+
+def _copy(results: Results) -> Results:
+    # Callers get their own dicts so they cannot edit the cached entry.
+    return [dict(result) for result in results]
+
+
+_CACHE: Optional[SearchCache] = None
+_CACHE_LOCK = threading.Lock()
+
+
+def get_search_cache() -> SearchCache:
+    """Shared cache for search_doordash, configured by DOORDASH_CACHE_TTL / _STALE / _SIZE / _PATH.
+
+    DOORDASH_CACHE_TTL=0 disables caching; DOORDASH_CACHE_PATH enables the sqlite store.
+    """
+    global _CACHE
+    with _CACHE_LOCK:
+        if _CACHE is None:
+            _CACHE = SearchCache.from_env()
+        return _CACHE
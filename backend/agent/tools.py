@@ -1,175 +1,336 @@
-from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.common.keys import Keys
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import TimeoutException, NoSuchElementException
+from selenium.common.exceptions import TimeoutException, NoSuchElementException, StaleElementReferenceException, WebDriverException
 from bs4 import BeautifulSoup
+from typing import Optional
+import logging
+import os
 import time
 import urllib.parse
+from browser_pool import get_browser_pool
+from search_cache import get_search_cache
 
-def parse_html(html: str) -> list[dict]:
-    print(f"Parsing HTML")
+# Optional fast parsers for parse_html; bs4 is the fallback.
+try:
+    from selectolax.lexbor import LexborHTMLParser
+except ImportError:
+    LexborHTMLParser = None
+try:
+    import lxml.html as lxml_html
+    from lxml.etree import ParserError as LxmlParserError
+except ImportError:
+    lxml_html = None
+    LxmlParserError = ValueError
+
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())  # quiet unless the application configures logging
+
+DOORDASH_ORIGIN = "https://www.doordash.com"
+STORE_LINK_CSS = "a[href*='/store/']"
+RESTAURANT_KEYWORDS = ("pizza", "restaurant", "food", "delivery", "takeout", "dine")
+NAVIGATION_TEXT = frozenset({"doordash", "back home", "home", "search"})
+
+# Fastest available parser first; bs4 with html.parser always works.
+PARSER_BACKENDS = tuple(name for name, available in (
+    ("selectolax", LexborHTMLParser is not None),
+    ("lxml", lxml_html is not None),
+    ("bs4", True),
+) if available)
+
+
+def _anchors_selectolax(html: str):
+    tree = LexborHTMLParser(html)
+    title = tree.css_first("title")
+
+    def select(store_only: bool) -> list[tuple[str, str]]:
+        nodes = tree.css(STORE_LINK_CSS if store_only else "a[href]")
+        return [(node.attributes.get("href") or "", node.text(strip=True)) for node in nodes]
+    return select, title.text(strip=True) if title else None
+
+
+def _anchors_lxml(html: str):
+    doc = lxml_html.document_fromstring(html)
+    title = doc.findtext(".//title")
+
+    def select(store_only: bool) -> list[tuple[str, str]]:
+        nodes = doc.xpath("//a[contains(@href, '/store/')]" if store_only else "//a[@href]")
+        # Same text as bs4's get_text(strip=True): every text node stripped, then joined.
+        return [(node.get("href", ""), "".join(t.strip() for t in node.itertext())) for node in nodes]
+    return select, title.strip() if title else None
+
+
+def _anchors_bs4(html: str):
     soup = BeautifulSoup(html, "html.parser")
-    
-    # Debug: Print page title to see what page we're on
-    title = soup.find('title')
-    if title:
-        print(f"Page title: {title.get_text()}")
-    
+    title = soup.find("title")
+
+    def select(store_only: bool) -> list[tuple[str, str]]:
+        nodes = soup.select(STORE_LINK_CSS if store_only else "a[href]")
+        return [(node.get("href", ""), node.get_text(strip=True)) for node in nodes]
+    return select, title.get_text() if title else None
+
+
+_ANCHOR_PARSERS = {"selectolax": _anchors_selectolax, "lxml": _anchors_lxml, "bs4": _anchors_bs4}
+
+
+def _store_url(href: str) -> str:
+    # Drop query parameters and fragments to get the base store URL
+    href = href.split("?", 1)[0].split("#", 1)[0]
+    return href if href.startswith("http") else f"{DOORDASH_ORIGIN}{href}"
+
+
+def parse_html(html: str, backend: Optional[str] = None) -> list[dict]:
+    """Extract DoorDash restaurant links from a page.
+
+    Store links (pattern: /store/{restaurant-name}-{location}-{id}/{store-id}/) come back
+    as type "restaurant", one entry per store URL. Pages without any fall back to links
+    whose text mentions food, typed "potential_restaurant".
+
+    `backend` picks the parser ("selectolax", "lxml" or "bs4"); by default the fastest
+    installed one is used.
+    """
+    backend = backend or PARSER_BACKENDS[0]
+    if not html:
+        return []
+    try:
+        select, title = _ANCHOR_PARSERS[backend](html)
+    except (ValueError, LxmlParserError) as e:
+        logger.debug("%s could not parse the page (%s), falling back to bs4", backend, e)
+        backend = "bs4"
+        select, title = _anchors_bs4(html)
+    logger.debug("Parsing HTML with %s, page title: %s", backend, title)
+
     results = []
-    
-    # Look for DoorDash store links specifically (based on the URL pattern provided)
-    # Pattern: /store/{restaurant-name}-{location}-{id}/{store-id}/
-    store_links = soup.find_all("a", href=True)
-    
-    for link in store_links:
-        href = link.get('href', '')
-        if isinstance(href, str) and '/store/' in href:
-            text = link.get_text(strip=True)
-            if text and len(text) > 3:
-                # Clean up the link to get the base store URL
-                if '?' in href:
-                    href = href.split('?')[0]  # Remove query parameters
-                if '#' in href:
-                    href = href.split('#')[0]  # Remove fragments
-                
-                # Make sure it's a full URL
-                if not href.startswith('http'):
-                    href = f"https://www.doordash.com{href}"
-                
-                results.append({
-                    "text": text,
-                    "link": href,
-                    "type": "restaurant"
-                })
-                print(f"Found restaurant: {text} -> {href}")
-    
+    seen: set[str] = set()
+    for href, text in select(store_only=True):
+        if len(text) <= 3:
+            continue
+        link = _store_url(href)
+        if link in seen:
+            continue
+        seen.add(link)
+        results.append({"text": text, "link": link, "type": "restaurant"})
+
     # If no store links found, look for any links that might be restaurants
     if not results:
-        print("No store links found, looking for restaurant-like links...")
-        restaurant_keywords = ['pizza', 'restaurant', 'food', 'delivery', 'takeout', 'dine']
-        
-        for link in store_links:
-            href = link.get('href', '')
-            text = link.get_text(strip=True)
-            
-            if text and len(text) > 3 and not text.lower() in ['doordash', 'back home', 'home', 'search']:
-                # Check if the text contains restaurant-related keywords
-                text_lower = text.lower()
-                if any(keyword in text_lower for keyword in restaurant_keywords):
-                    if isinstance(href, str) and not href.startswith('http'):
-                        href = f"https://www.doordash.com{href}"
-                    
-                    results.append({
-                        "text": text,
-                        "link": href,
-                        "type": "potential_restaurant"
-                    })
-                    print(f"Found potential restaurant: {text} -> {href}")
-    
-    # Debug: Print summary
-    print(f"Total restaurant results found: {len(results)}")
-    if len(results) > 0:
-        print("Restaurant results:")
-        for i, result in enumerate(results[:10]):  # Show first 10
-            print(f"  {i+1}. {result['text']} -> {result['link']}")
-    
+        logger.debug("No store links found, looking for restaurant-like links")
+        for href, text in select(store_only=False):
+            text_lower = text.lower()
+            if len(text) <= 3 or text_lower in NAVIGATION_TEXT:
+                continue
+            if not any(keyword in text_lower for keyword in RESTAURANT_KEYWORDS):
+                continue
+            link = href if href.startswith("http") else f"{DOORDASH_ORIGIN}{href}"
+            if link in seen:
+                continue
+            seen.add(link)
+            results.append({"text": text, "link": link, "type": "potential_restaurant"})
+
+    logger.info("Found %d restaurant results", len(results))
+    if logger.isEnabledFor(logging.DEBUG):
+        for i, result in enumerate(results[:10]):
+            logger.debug("  %d. %s -> %s", i + 1, result["text"], result["link"])
     return results
 
 
-def search_doordash(url: str, search_term: str, location: str) -> list[dict]:
-    print(f"Searching {url} for {search_term} in {location}")
-    
-    # Configure Chrome options to avoid detection
-    options = webdriver.ChromeOptions()
-    options.add_argument("--headless")
-    options.add_argument("--no-sandbox")
-    options.add_argument("--disable-dev-shm-usage")
-    options.add_argument("--disable-blink-features=AutomationControlled")
-    options.add_experimental_option("excludeSwitches", ["enable-automation"])
-    options.add_experimental_option('useAutomationExtension', False)
-    options.add_argument("--user-agent=Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36")
-    
-    driver = webdriver.Chrome(options=options)
-    
-    # Remove webdriver property to avoid detection
-    driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
-    
+# Override to point the search at locally served fixture pages (see fixtures/).
+DOORDASH_BASE_URL = os.getenv("DOORDASH_BASE_URL", "https://www.doordash.com")
+
+MIN_RESULTS = 3  # more than just navigation links
+
+# Any one of these is taken as the search box.
+SEARCH_INPUT_XPATH = " | ".join([
+    '//input[contains(@placeholder, "Search")]',
+    '//input[contains(@placeholder, "search")]',
+    '//input[@type="text"]',
+    '//input[contains(@class, "search")]',
+    '//input[contains(@id, "search")]',
+    '//input[contains(@name, "search")]',
+    '//input[contains(@aria-label, "Search")]',
+    '//input[contains(@aria-label, "search")]'
+])
+
+
+def parse_page(driver) -> list[dict]:
+    """parse_html on the current tab; with DOORDASH_SAVE_PAGES=<dir> the page is also saved
+    there, e.g. as a fixture for bench_parse_html.py."""
+    html = driver.page_source
+    directory = os.getenv("DOORDASH_SAVE_PAGES")
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"page_{time.strftime('%Y%m%d_%H%M%S')}_{time.monotonic_ns() % 10**6}.html")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(html)
+        logger.debug("Saved page to %s", path)
+    return parse_html(html)
+
+
+def candidate_search_urls(search_term: str, location: str, base_url: str = DOORDASH_BASE_URL) -> list[str]:
+    # Different DoorDash search URL patterns, in order of preference
+    return [
+        f"{base_url}/search?query={urllib.parse.quote(search_term)}&location={urllib.parse.quote(location)}",
+        f"{base_url}/search?query={urllib.parse.quote(f'{search_term} {location}')}",
+        f"{base_url}/food-delivery/{urllib.parse.quote(location)}-restaurants/",
+        f"{base_url}/food-delivery/{urllib.parse.quote(location)}-food-delivery/"
+    ]
+
+
+def _store_link_count(driver) -> int:
+    return driver.execute_script(f"return document.querySelectorAll(\"{STORE_LINK_CSS}\").length")
+
+
+def wait_for_store_links(driver, min_results: int = MIN_RESULTS, timeout: float = 10) -> bool:
+    """Return as soon as `min_results` store links are rendered, or False after `timeout`."""
     try:
-        # Try different DoorDash search URL patterns
-        search_urls = [
-            f"https://www.doordash.com/search?query={urllib.parse.quote(search_term)}&location={urllib.parse.quote(location)}",
-            f"https://www.doordash.com/search?query={urllib.parse.quote(f'{search_term} {location}')}",
-            f"https://www.doordash.com/food-delivery/{urllib.parse.quote(location)}-restaurants/",
-            f"https://www.doordash.com/food-delivery/{urllib.parse.quote(location)}-food-delivery/"
-        ]
-        
-        for i, search_url in enumerate(search_urls):
-            print(f"Trying search URL {i+1}: {search_url}")
-            driver.get(search_url)
-            time.sleep(8)  # Wait for search results
-            
-            page_html = driver.page_source
-            parsed_html = parse_html(page_html)
-            
-            if len(parsed_html) > 2:  # More than just navigation links
-                print(f"Found {len(parsed_html)} links via URL {i+1}")
-                return parsed_html
-        
-        # If direct URLs don't work, try the form-based approach
-        print("Direct URLs didn't work, trying form-based search...")
-        driver.get(url)
-        print("Page loaded, waiting for elements...")
-        
-        # Wait for page to load with explicit wait
-        wait = WebDriverWait(driver, 20)
-        
-        # Try multiple selectors for the search input
-        search_selectors = [
-            '//input[contains(@placeholder, "Search")]',
-            '//input[contains(@placeholder, "search")]',
-            '//input[@type="text"]',
-            '//input[contains(@class, "search")]',
-            '//input[contains(@id, "search")]',
-            '//input[contains(@name, "search")]',
-            '//input[contains(@aria-label, "Search")]',
-            '//input[contains(@aria-label, "search")]'
-        ]
-        
-        search_food = None
-        for selector in search_selectors:
+        WebDriverWait(driver, timeout, poll_frequency=0.2).until(lambda d: _store_link_count(d) >= min_results)
+        return True
+    except TimeoutException:
+        return False
+
+
+def _open_tab(driver, url: str, known: set) -> Optional[str]:
+    # Handle of the tab window.open created, or None if the browser blocked it.
+    driver.execute_script("window.open(arguments[0], '_blank');", url)
+    handle = next((h for h in driver.window_handles if h not in known), None)
+    if handle is not None:
+        known.add(handle)
+    return handle
+
+
+def _usable_results(driver, min_results: int) -> list[dict]:
+    # With page_load_strategy "none" a tab can still be navigating or showing an
+    # error page; a script or window error there just means "not ready yet".
+    try:
+        if _store_link_count(driver) < min_results:
+            return []
+        parsed_html = parse_page(driver)
+    except WebDriverException as e:
+        logger.debug("Probe page not ready: %s", e.msg)
+        return []
+    # Image-only store anchors can render before the named ones; keep waiting for those.
+    return parsed_html if len(parsed_html) >= min_results else []
+
+
+def probe_search_urls(driver, urls: list[str], min_results: int = MIN_RESULTS, timeout: float = 10) -> list[dict]:
+    """Open every URL in its own tab at once and return the parsed results of the first tab that renders enough store links.
+
+    Returns [] if no tab qualifies within `timeout`. The probe tabs are closed before returning.
+    If the browser blocks new tabs, the URLs are tried one after another in the current tab.
+    """
+    origin = driver.current_window_handle
+    known = set(driver.window_handles)
+    tabs: dict[str, str] = {}
+    for search_url in urls:
+        handle = _open_tab(driver, search_url, known)
+        if handle is None:
+            break
+        tabs[handle] = search_url
+
+    try:
+        if not tabs:
+            print("Could not open probe tabs, trying search URLs one by one...")
+            return _probe_sequentially(driver, urls, min_results, timeout)
+
+        deadline = time.monotonic() + timeout
+        while True:
+            for handle, search_url in tabs.items():
+                try:
+                    driver.switch_to.window(handle)
+                except WebDriverException:
+                    continue  # tab crashed or was closed by the page
+                parsed_html = _usable_results(driver, min_results)
+                if parsed_html:
+                    print(f"Found {len(parsed_html)} links via {search_url}")
+                    return parsed_html
+            if time.monotonic() >= deadline:
+                return []
+            time.sleep(0.2)
+    finally:
+        for handle in tabs:
             try:
-                search_food = wait.until(EC.element_to_be_clickable((By.XPATH, selector)))
-                print(f"Found search input with selector: {selector}")
-                break
-            except TimeoutException:
-                continue
-        
-        if not search_food:
-            # If no search input found, try to get the page content anyway
-            print("No search input found, getting page content...")
-            page_html = driver.page_source
-            return parse_html(page_html)
-        
-        # Clear the input and enter search terms
-        search_food.clear()
-        search_food.send_keys(f"{search_term} {location}")
-        time.sleep(2)
-        search_food.send_keys(Keys.ENTER)
-        
-        print("Search submitted, waiting for results...")
-        time.sleep(8)  # Wait for search results to load
-        
-        page_html = driver.page_source
-        parsed_html = parse_html(page_html)
-        
-        print(f"Found {len(parsed_html)} links")
+                driver.switch_to.window(handle)
+                driver.close()
+            except WebDriverException:
+                pass  # already gone
+        driver.switch_to.window(origin)
+
+
+def _probe_sequentially(driver, urls: list[str], min_results: int, timeout: float) -> list[dict]:
+    # `timeout` covers all URLs together, page loads included.
+    deadline = time.monotonic() + timeout
+    per_url = timeout / max(len(urls), 1)
+    for search_url in urls:
+        if time.monotonic() >= deadline:
+            break
+        try:
+            driver.get(search_url)
+        except WebDriverException as e:
+            logger.debug("Could not open %s: %s", search_url, e)
+            continue
+        wait = min(per_url, deadline - time.monotonic())
+        if wait <= 0:
+            break
+        try:
+            parsed_html = WebDriverWait(driver, wait, poll_frequency=min(0.2, wait)).until(lambda d: _usable_results(d, min_results))
+        except TimeoutException:
+            continue
+        print(f"Found {len(parsed_html)} links via {search_url}")
         return parsed_html
-        
+    return []
+
+
+def search_doordash(url: str, search_term: str, location: str) -> list[dict]:
+    # Recent results for the same (normalized) term and location are reused, and
+    # concurrent identical searches share one browser run; see search_cache.py.
+    return get_search_cache().get(search_term, location, lambda: _search_doordash(url, search_term, location))
+
+
+def _search_doordash(url: str, search_term: str, location: str) -> list[dict]:
+    print(f"Searching {url} for {search_term} in {location}")
+    try:
+        # Reuse a warm browser from the pool; a crashed session is retired on checkin.
+        with get_browser_pool().session() as driver:
+            return _search_with_driver(driver, url, search_term, location)
     except Exception as e:
         print(f"Error during search: {str(e)}")
         # Return empty results on error
         return []
-    finally:
-        driver.quit()
\ No newline at end of file
+
+
+def _search_with_driver(driver, url: str, search_term: str, location: str, base_url: str = DOORDASH_BASE_URL) -> list[dict]:
+    parsed_html = probe_search_urls(driver, candidate_search_urls(search_term, location, base_url))
+    if parsed_html:
+        return parsed_html
+
+    # If direct URLs don't work, try the form-based approach
+    print("Direct URLs didn't work, trying form-based search...")
+    driver.get(url)
+    print("Page loaded, waiting for elements...")
+
+    try:
+        search_food = WebDriverWait(driver, 20).until(EC.element_to_be_clickable((By.XPATH, SEARCH_INPUT_XPATH)))
+    except TimeoutException:
+        # If no search input found, try to get the page content anyway
+        print("No search input found, getting page content...")
+        return parse_page(driver)
+
+    # Clear the input and enter search terms
+    query = f"{search_term} {location}"
+    search_food.clear()
+    search_food.send_keys(query)
+    try:
+        WebDriverWait(driver, 5).until(lambda d: search_food.get_attribute("value") == query)
+    except (TimeoutException, StaleElementReferenceException):
+        pass  # the field rewrote its value (autocomplete, maxlength) or re-rendered; submit anyway
+    try:
+        search_food.send_keys(Keys.ENTER)
+    except StaleElementReferenceException:
+        driver.find_element(By.XPATH, SEARCH_INPUT_XPATH).send_keys(Keys.ENTER)
+
+    print("Search submitted, waiting for results...")
+    wait_for_store_links(driver)
+
+    parsed_html = parse_page(driver)
+    print(f"Found {len(parsed_html)} links")
+    return parsed_html
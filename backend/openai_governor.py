@@ -0,0 +1,458 @@
+"""Client-side rate governor shared by every OpenAI entry point.
+
+All callers (agent/llm.py, DSPy's LM and, via `GovernedChatOpenAI`, the FPL graph
+and the wiki agent) go through one `OpenAIGovernor`:
+
+- token buckets for requests/minute and tokens/minute, kept in a small state
+  file guarded by `fcntl.flock`, so every worker process on the host draws from
+  the same budget (per-process buckets when `fcntl` is unavailable)
+- a priority queue per process: interactive calls are admitted ahead of batch
+- on a 429 the shared bucket is drained and paused, and the caller retries
+  with full-jitter exponential backoff (or the server's Retry-After)
+
+`FakeOpenAIServer` is a local chat-completions endpoint that returns 429s above
+its own rate limit; run this module to exercise the governor against it.
+"""
+from __future__ import annotations
+
+import asyncio
+import heapq
+import itertools
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterator, List, Optional, TypeVar
+
+try:
+    import fcntl
+except ImportError:  # non-POSIX: fall back to per-process buckets
+    fcntl = None  # type: ignore
+
+# Optional: only needed for GovernedChatOpenAI.
+try:
+    from langchain_core.messages import BaseMessage
+    from langchain_core.outputs import ChatGenerationChunk, ChatResult
+    from langchain_openai import ChatOpenAI
+except ImportError:
+    ChatOpenAI = None  # type: ignore
+
+T = TypeVar("T")
+
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BATCH = 10
+
+_PRIORITY: ContextVar[int] = ContextVar("openai_priority", default=PRIORITY_INTERACTIVE)
+
+
+@contextmanager
+def request_priority(priority: int) -> Iterator[None]:
+    """Run OpenAI calls made inside the block (and in copied contexts) at `priority`."""
+    token = _PRIORITY.set(priority)
+    try:
+        yield
+    finally:
+        _PRIORITY.reset(token)
+
+
+def current_priority() -> int:
+    return _PRIORITY.get()
+
+
+def estimate_tokens(text: Any, completion_tokens: int = 512) -> int:
+    """Rough prompt+completion estimate (~4 chars per token) used to reserve TPM budget."""
+    if not isinstance(text, str):
+        text = json.dumps(text, default=str)
+    return len(text) // 4 + completion_tokens
+
+
+def is_rate_limited(error: BaseException) -> bool:
+    status = getattr(error, "status_code", None) or getattr(getattr(error, "response", None), "status_code", None)
+    return status == 429 or type(error).__name__ == "RateLimitError"
+
+
+def retry_after(error: BaseException) -> Optional[float]:
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    try:
+        value = headers.get("retry-after") or headers.get("Retry-After")
+        return float(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+# ----------------------
+# Shared token buckets
+# ----------------------
+
+class SharedBuckets:
+    """Request and token buckets persisted in a JSON file under an exclusive flock."""
+
+    def __init__(self, rpm: int, tpm: int, path: str):
+        self.rpm = rpm
+        self.tpm = tpm
+        self.path = path
+        self._local: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def _state(self) -> Iterator[Dict[str, float]]:
+        with self._lock:
+            if fcntl is None:
+                yield self._local
+                return
+            with open(self.path, "a+") as f:
+                fcntl.flock(f, fcntl.LOCK_EX)
+                try:
+                    f.seek(0)
+                    raw = f.read()
+                    try:
+                        state = json.loads(raw) if raw else {}
+                    except ValueError:
+                        state = {}
+                    yield state
+                    f.seek(0)
+                    f.truncate()
+                    f.write(json.dumps(state))
+                    f.flush()
+                finally:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _refill(self, state: Dict[str, float], now: float) -> None:
+        last = state.get("updated_at", now)
+        elapsed = max(0.0, now - last)
+        state["requests"] = min(float(self.rpm), state.get("requests", float(self.rpm)) + elapsed * self.rpm / 60)
+        state["tokens"] = min(float(self.tpm), state.get("tokens", float(self.tpm)) + elapsed * self.tpm / 60)
+        state["updated_at"] = max(last, now)  # never earlier than the end of a 429 pause
+
+    def try_take(self, tokens: int) -> float:
+        """Take one request and `tokens` tokens; return 0, or seconds to wait before retrying."""
+        tokens = min(tokens, self.tpm)  # a single oversized call must still be admissible
+        now = time.time()
+        with self._state() as state:
+            self._refill(state, now)
+            blocked = state.get("blocked_until", 0.0) - now
+            if blocked > 0:
+                return blocked
+            if state["requests"] >= 1 and state["tokens"] >= tokens:
+                state["requests"] -= 1
+                state["tokens"] -= tokens
+                return 0.0
+            need_req = max(0.0, 1 - state["requests"]) * 60 / self.rpm
+            need_tok = max(0.0, tokens - state["tokens"]) * 60 / self.tpm
+            return max(need_req, need_tok)
+
+    def adjust_tokens(self, delta: int) -> None:
+        """Refund (negative) or charge (positive) the difference between estimated and actual tokens."""
+        with self._state() as state:
+            self._refill(state, time.time())
+            state["tokens"] = min(float(self.tpm), state["tokens"] - delta)
+
+    def penalize(self, seconds: float) -> None:
+        """After a 429: drain the request bucket and pause every process for `seconds`.
+
+        Refill starts when the pause ends, so the buckets admit calls at the normal
+        rate afterwards instead of releasing everything that queued up at once.
+        """
+        now = time.time()
+        with self._state() as state:
+            self._refill(state, now)
+            state["requests"] = 0.0
+            state["blocked_until"] = max(state.get("blocked_until", 0.0), now + seconds)
+            state["updated_at"] = state["blocked_until"]
+
+
+# ----------------------
+# Governor
+# ----------------------
+
+class OpenAIGovernor:
+    """Admission control + retry policy for OpenAI calls. Use `get_governor()` for the shared instance."""
+
+    def __init__(
+        self,
+        rpm: int = 500,
+        tpm: int = 200_000,
+        state_path: Optional[str] = None,
+        max_retries: int = 6,
+        base_delay: float = 0.5,
+        max_delay: float = 30.0,
+    ):
+        state_path = state_path or os.path.join(tempfile.gettempdir(), f"openai_governor_{rpm}_{tpm}.json")
+        self.buckets = SharedBuckets(rpm, tpm, state_path)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._cond = threading.Condition()
+        self._waiters: List[tuple] = []
+        self._seq = itertools.count()
+        self.stats = {"admitted": 0, "rate_limited": 0, "retries": 0, "wait_seconds": 0.0}
+
+    @classmethod
+    def from_env(cls) -> "OpenAIGovernor":
+        return cls(
+            rpm=int(os.getenv("OPENAI_RPM", "500")),
+            tpm=int(os.getenv("OPENAI_TPM", "200000")),
+            state_path=os.getenv("OPENAI_GOVERNOR_STATE") or None,
+            max_retries=int(os.getenv("OPENAI_MAX_RETRIES", "6")),
+        )
+
+    def acquire(self, tokens: int = 1000, priority: Optional[int] = None, timeout: Optional[float] = None) -> None:
+        """Block until this process's highest-priority waiter is us and the shared buckets admit the call."""
+        priority = current_priority() if priority is None else priority
+        ticket = (priority, next(self._seq))
+        start = time.monotonic()
+        with self._cond:
+            heapq.heappush(self._waiters, ticket)
+            try:
+                while True:
+                    wait = 0.05
+                    if self._waiters[0] == ticket:
+                        wait = self.buckets.try_take(tokens)
+                        if wait <= 0:
+                            self.stats["admitted"] += 1
+                            self.stats["wait_seconds"] += time.monotonic() - start
+                            return
+                    if timeout is not None and time.monotonic() - start + wait > timeout:
+                        raise TimeoutError(f"OpenAI governor could not admit a call within {timeout}s")
+                    # Jitter so processes sharing the buckets don't poll in lockstep.
+                    self._cond.wait(min(wait, 1.0) * random.uniform(0.8, 1.2))
+            finally:
+                self._waiters.remove(ticket)
+                heapq.heapify(self._waiters)
+                self._cond.notify_all()
+
+    def _backoff(self, attempt: int, error: BaseException) -> float:
+        delay = retry_after(error)
+        if delay is None:
+            delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+        with self._cond:
+            self.stats["rate_limited"] += 1
+            self.stats["retries"] += 1
+        self.buckets.penalize(delay)
+        return delay
+
+    def _settle(self, tokens: int, result: Any) -> None:
+        usage = getattr(result, "usage", None) or getattr(result, "usage_metadata", None)
+        if usage is None and isinstance(getattr(result, "llm_output", None), dict):
+            usage = result.llm_output.get("token_usage")  # LangChain ChatResult
+        actual = getattr(usage, "total_tokens", None)
+        if actual is None and isinstance(usage, dict):
+            actual = usage.get("total_tokens")
+        if isinstance(actual, int):
+            self.buckets.adjust_tokens(actual - min(tokens, self.buckets.tpm))
+
+    def call(self, fn: Callable[[], T], tokens: int = 1000, priority: Optional[int] = None) -> T:
+        """Run `fn()` once admitted; on 429, back off (shared) and retry up to max_retries."""
+        priority = current_priority() if priority is None else priority
+        for attempt in range(self.max_retries + 1):
+            self.acquire(tokens, priority)
+            try:
+                result = fn()
+            except Exception as e:
+                if not is_rate_limited(e) or attempt == self.max_retries:
+                    raise
+                self._backoff(attempt, e)
+                continue
+            self._settle(tokens, result)
+            return result
+        raise RuntimeError("unreachable")
+
+    async def acall(self, fn: Callable[[], Awaitable[T]], tokens: int = 1000, priority: Optional[int] = None) -> T:
+        """Async `call`: admission waits on a worker thread so the event loop stays free."""
+        priority = current_priority() if priority is None else priority
+        for attempt in range(self.max_retries + 1):
+            await asyncio.to_thread(self.acquire, tokens, priority)
+            try:
+                result = await fn()
+            except Exception as e:
+                if not is_rate_limited(e) or attempt == self.max_retries:
+                    raise
+                self._backoff(attempt, e)
+                continue
+            self._settle(tokens, result)
+            return result
+        raise RuntimeError("unreachable")
+
+
+_GOVERNOR: Optional[OpenAIGovernor] = None
+_GOVERNOR_LOCK = threading.Lock()
+
+
+def get_governor() -> OpenAIGovernor:
+    """Process-wide governor, configured from OPENAI_RPM / OPENAI_TPM / OPENAI_GOVERNOR_STATE."""
+    global _GOVERNOR
+    with _GOVERNOR_LOCK:
+        if _GOVERNOR is None:
+            _GOVERNOR = OpenAIGovernor.from_env()
+        return _GOVERNOR
+
+
+# ----------------------
+# LangChain
+# ----------------------
+
+if ChatOpenAI is not None:
+
+    class GovernedChatOpenAI(ChatOpenAI):
+        """ChatOpenAI whose requests go through the shared OpenAI governor (admission, 429 backoff, token settling).
+
+        Streamed calls are admitted (and retried on 429) up to their first chunk.
+        """
+
+        max_retries: int = 0  # the governor owns retries
+
+        def _tokens(self, messages: List[BaseMessage]) -> int:
+            return estimate_tokens([m.content for m in messages])
+
+        def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs: Any) -> ChatResult:
+            parent = super()._generate
+            return get_governor().call(lambda: parent(messages, stop=stop, run_manager=run_manager, **kwargs), tokens=self._tokens(messages))
+
+        async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs: Any) -> ChatResult:
+            parent = super()._agenerate
+            return await get_governor().acall(lambda: parent(messages, stop=stop, run_manager=run_manager, **kwargs), tokens=self._tokens(messages))
+
+        def _stream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+            parent = super()._stream
+
+            def start():
+                chunks = parent(messages, stop=stop, run_manager=run_manager, **kwargs)
+                return next(chunks, None), chunks
+
+            first, chunks = get_governor().call(start, tokens=self._tokens(messages))
+            if first is not None:
+                yield first
+                yield from chunks
+
+        async def _astream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs: Any) -> AsyncIterator[ChatGenerationChunk]:
+            parent = super()._astream
+
+            async def start():
+                chunks = parent(messages, stop=stop, run_manager=run_manager, **kwargs)
+                try:
+                    return await chunks.__anext__(), chunks
+                except StopAsyncIteration:
+                    return None, chunks
+
+            first, chunks = await get_governor().acall(start, tokens=self._tokens(messages))
+            if first is not None:
+                yield first
+                async for chunk in chunks:
+                    yield chunk
+
+
+# ----------------------
+# Local fake server
+# ----------------------
+
+class FakeOpenAIServer:
+    """Local /v1/chat/completions endpoint that allows `limit` requests per rolling `window` seconds and 429s the rest.
+
+    Point a client at it with `openai.OpenAI(base_url=server.base_url, api_key="test")`.
+    """
+
+    def __init__(self, limit: int = 60, window: float = 60.0, retry_after: Optional[float] = None, port: int = 0):
+        self.limit = limit
+        self.window = window
+        self.retry_after = retry_after
+        self.accepted: List[float] = []
+        self.rejected = 0
+        self._lock = threading.Lock()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                self.rfile.read(int(self.headers.get("content-length", 0)))
+                if server._admit():
+                    body = {
+                        "id": "chatcmpl-fake",
+                        "object": "chat.completion",
+                        "created": int(time.time()),
+                        "model": "fake",
+                        "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": "ok"}}],
+                        "usage": {"prompt_tokens": 10, "completion_tokens": 1, "total_tokens": 11},
+                    }
+                    self._reply(200, body)
+                else:
+                    self._reply(429, {"error": {"message": "Rate limit reached", "type": "requests", "code": "rate_limit_exceeded"}})
+
+            def _reply(self, status: int, body: dict):
+                data = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("content-type", "application/json")
+                self.send_header("content-length", str(len(data)))
+                if status == 429 and server.retry_after is not None:
+                    self.send_header("retry-after", str(server.retry_after))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def _admit(self) -> bool:
+        now = time.time()
+        with self._lock:
+            self.accepted = [t for t in self.accepted if now - t < self.window]
+            if len(self.accepted) < self.limit:
+                self.accepted.append(now)
+                return True
+            self.rejected += 1
+            return False
+
+    def __enter__(self) -> "FakeOpenAIServer":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+
+if __name__ == "__main__":
+    import urllib.error
+    import urllib.request
+    from concurrent.futures import ThreadPoolExecutor
+
+    class HTTP429(Exception):
+        def __init__(self, err: urllib.error.HTTPError):
+            super().__init__(str(err))
+            self.status_code = err.code
+            self.response = err
+
+    # The governor's limit (1200 rpm) is deliberately looser than the server's (10 per second window = 600 rpm),
+    # so some calls get 429s and go through the shared backoff path.
+    with FakeOpenAIServer(limit=10, window=1.0) as server, tempfile.TemporaryDirectory() as tmp:
+        governor = OpenAIGovernor(rpm=1200, tpm=1_000_000, state_path=os.path.join(tmp, "state.json"), base_delay=0.2)
+
+        def post() -> dict:
+            req = urllib.request.Request(f"{server.base_url}/chat/completions", data=b"{}", method="POST")
+            try:
+                with urllib.request.urlopen(req) as resp:
+                    return json.load(resp)
+            except urllib.error.HTTPError as e:
+                raise HTTP429(e) if e.code == 429 else e
+
+        def one(i: int) -> float:
+            start = time.monotonic()
+            priority = PRIORITY_INTERACTIVE if i % 4 == 0 else PRIORITY_BATCH
+            governor.call(post, tokens=50, priority=priority)
+            return time.monotonic() - start
+
+        with ThreadPoolExecutor(max_workers=16) as pool:
+            latencies = list(pool.map(one, range(40)))
+        print(f"calls={len(latencies)} server rejected={server.rejected}")
+        print(f"governor stats={governor.stats}")
+        print(f"max client latency={max(latencies):.2f}s")